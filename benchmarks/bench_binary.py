@@ -0,0 +1,66 @@
+import argparse
+import io
+import time
+
+import numpy as np
+
+from ivtools.binary import ASCII_HEADER, BinaryReader, BinaryWriter
+from ivtools.node import Node
+from ivtools.parser import IVParser
+from ivtools.writer import IVWriter
+
+
+def mesh(points, seed=0):
+    # One large triangle mesh, as CAD exports tessellate a part
+    rand = np.random.default_rng(seed)
+    root = Node()
+    separator = Node("Separator")
+    separator.add_node(Node("Material", fields={"diffuseColor": "0.8 0.8 0.8"}))
+    separator.add_node(Node("Coordinate3", fields={"point": rand.random((points, 3), np.float32)}))
+    index = np.full((points - 2, 4), -1, np.int32)
+    index[:, 0] = np.arange(points - 2)
+    index[:, 1] = index[:, 0] + 1
+    index[:, 2] = index[:, 0] + 2
+    separator.add_node(Node("IndexedFaceSet", fields={"coordIndex": index.ravel()}))
+    root.add_node(separator)
+    return root
+
+
+def arrays(data):
+    separator = data.nodes()[0]
+    return [node.get_field(name) for node, name in zip(separator.nodes()[1:], ("point", "coordIndex"))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Size and read and write times of one mesh in the ASCII and binary "
+                                                 "Inventor formats")
+    parser.add_argument("--points", type=int, default=1000000)
+    args = parser.parse_args()
+
+    data = mesh(args.points)
+    print("%-8s %8s %8s %10s" % ("", "write", "read", "size"))
+    for label in ("ascii", "binary"):
+        if label == "ascii":
+            output = io.StringIO()
+            start = time.perf_counter()
+            IVWriter(output).write(ASCII_HEADER, data)
+        else:
+            output = io.BytesIO()
+            start = time.perf_counter()
+            BinaryWriter(output).write(data)
+        write_time = time.perf_counter() - start
+        output.seek(0)
+        start = time.perf_counter()
+        if label == "ascii":
+            _, new_data = IVParser().read(output)
+        else:
+            _, new_data = BinaryReader().read(output)
+        read_time = time.perf_counter() - start
+        print("%-8s %7.3fs %7.3fs %8.1fMB" % (label, write_time, read_time, len(output.getvalue()) / 1e6))
+        # Both formats hold the float32 values exactly, as floats are written with the digits that read them back
+        for old, new in zip(arrays(data), arrays(new_data)):
+            assert np.array_equal(old, new), "%s round trip changed the mesh" % label
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import time
+
+from ivtools.events import END, FIELD, START
+from ivtools.namespace import Namespace
+from ivtools.parser import TreeBuilder
+
+
+class LegacyBuilder(object):
+
+    # The path-based Namespace building that TreeBuilder replaced, kept for comparison. Every step walks
+    # the NODE_i, CHILDREN path from the root
+
+    def __init__(self):
+        self.data = Namespace()
+        self.sub_space = []
+
+    def feed(self, events):
+        for event in events:
+            if event[0] == START:
+                node = "NODE_%i" % len(self.data.get(self.sub_space))
+                self.data.add({node: {"NAME": event[1], "COMMENT": event[2], "CHILDREN": {}}}, sub_space=self.sub_space)
+                self.sub_space = self.sub_space + [node, "CHILDREN"]
+            elif event[0] == FIELD:
+                self.data.add({event[1]: event[2]}, sub_space=self.sub_space)
+            elif event[0] == END:
+                self.sub_space = self.sub_space[:-2]
+
+
+def per_field(builder, depth, fields):
+    # Opens a chain of depth nodes, then times adding fields to the deepest one
+    events = [(FIELD, "field_%i" % i, "1 1 1") for i in range(fields)]
+    try:
+        builder.feed([(START, "DEF part_%i Transform" % i, None) for i in range(depth)])
+        start = time.perf_counter()
+        builder.feed(events)
+    except RecursionError:
+        return "RecursionError"
+    elapsed = time.perf_counter() - start
+    builder.feed([(END,)] * depth)
+    return "%.0f ns" % (elapsed / fields * 1e9)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-field cost of building trees as nesting depth grows")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--fields", type=int, default=100000)
+    parser.add_argument("--legacy-fields", type=int, default=1000, help="Fields for the slower path-based builder")
+    args = parser.parse_args()
+
+    print("%8s %16s %16s" % ("depth", "path-based", "TreeBuilder"))
+    for depth in args.depths:
+        print("%8i %16s %16s" % (
+            depth, per_field(LegacyBuilder(), depth, args.legacy_fields), per_field(TreeBuilder(), depth, args.fields)
+        ))
+
+
+if __name__ == "__main__":
+    main()
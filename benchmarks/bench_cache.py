@@ -0,0 +1,41 @@
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.bench_parser import parse_size
+from benchmarks.synthetic import SceneGenerator
+from ivtools.cache import ParseCache
+from ivtools.editor import IVEditor
+
+
+def timed_read(editor, file_path):
+    start = time.perf_counter()
+    editor.read(file_path)
+    elapsed = time.perf_counter() - start
+    output = io.StringIO()
+    editor.write(output)
+    return elapsed, output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse time versus cached reads")
+    parser.add_argument("--size", default="50MB")
+    parser.add_argument("--points", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=args.points).write(file_path, parse_size(args.size))
+        cache = ParseCache(os.path.join(directory, "cache"))
+        parse_time, expected = timed_read(IVEditor(), file_path)
+        miss_time, _ = timed_read(IVEditor(cache=cache), file_path)
+        hit_time, output = timed_read(IVEditor(cache=cache), file_path)
+        assert output == expected, "Cached scene differs from the parsed scene"
+        print("parse %8.3fs  miss %8.3fs  hit %8.3fs  speedup %.1fx" % (parse_time, miss_time, hit_time, parse_time / hit_time))
+        print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
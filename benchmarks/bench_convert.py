@@ -0,0 +1,85 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import SceneGenerator
+from ivtools.convert import CONVERTERS, get_converter
+from ivtools.node import Node
+from ivtools.parser import IVParser
+from ivtools.traverse import descendants
+
+
+def assembly(data, group):
+    # Nests the top-level shapes in VRML transforms of group shapes each
+    root = Node()
+    shapes = data.nodes()
+    for i in range(0, len(shapes), group):
+        transform = Node("DEF assembly_%i Transform" % (i // group), fields={"translation": "%i 0 0" % i})
+        children = Node("children [")
+        for shape in shapes[i:i + group]:
+            children.add_node(shape)
+        transform.add_node(children)
+        root.add_node(transform)
+    return root
+
+
+def geometry_counts(data):
+    # Geometry nodes, points and faces, which conversions must preserve
+    shapes = points = faces = 0
+    for node in descendants(data):
+        if node.type == "IndexedFaceSet":
+            shapes += 1
+            if "coordIndex" in node.fields:
+                faces += int(np.count_nonzero(np.asarray(node.get_field("coordIndex")) == -1))
+        elif node.type in ("Coordinate", "Coordinate3") and "point" in node.fields:
+            points += len(node.get_field("point"))
+    return shapes, points, faces
+
+
+def def_names(data):
+    return {node.def_name for node in descendants(data) if node.def_name is not None}
+
+
+def timed_convert(ext, data):
+    converter = get_converter(ext)
+    start = time.perf_counter()
+    new_data = converter.convert_data(data)
+    return time.perf_counter() - start, converter.nodes, new_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversion backends on a large assembly, with round-trip checks")
+    parser.add_argument("--shapes", type=int, default=50000)
+    parser.add_argument("--points", type=int, default=20)
+    parser.add_argument("--group", type=int, default=10, help="Shapes per assembly transform")
+    parser.add_argument("--def-density", type=float, default=0.5, help="Share of shapes with DEF names")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=args.points, def_density=args.def_density).write(file_path, shapes=args.shapes)
+        with open(file_path, "r") as file:
+            _, data = IVParser().read(file)
+    data = assembly(data, args.group)
+    expected = geometry_counts(data)
+    names = def_names(data)
+    print("source    %i shapes, %i points, %i faces, %i DEF names" % (expected + (len(names),)))
+
+    # wrl -> iv -> wrl -> iv
+    for ext in ["iv", "wrl", "iv"]:
+        source = data
+        elapsed, nodes, data = timed_convert(ext, source)
+        counts = geometry_counts(data)
+        print("to %-4s %8.3fs  %8i nodes  %6.0f ns/node  %s" % (ext, elapsed, nodes, elapsed / nodes * 1e9, counts))
+        assert counts == expected, "Converting to %s changed the geometry counts" % ext
+        assert geometry_counts(source) == expected, "Converting to %s changed the source" % ext
+        # Unnamed shapes may gain names from their comments, but none are lost
+        assert names <= def_names(data), "Converting to %s lost DEF names" % ext
+    print("round trip preserved geometry counts and DEF names; backends: %s" % ", ".join(sorted(CONVERTERS)))
+
+
+if __name__ == "__main__":
+    main()
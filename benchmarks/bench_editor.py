@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic import SceneGenerator
+from ivtools.editor import IVEditor
+from ivtools.metrics import Metrics
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+TEMPLATE = "Material:\n  diffuseColor: 0.8 0.8 0.8\n  transparency:\nTransform:\n  translation: 0 0 0\n"
+# Slower than this against the compared results counts as a regression, for operations that take long enough
+# for the difference to be more than noise
+THRESHOLD = 1.25
+MIN_SECONDS = 0.05
+
+
+def operations(directory):
+    # The editor operations in the order they run on one scene, each with its own timing
+    scene_path = os.path.join(directory, "scene.wrl")
+    nodes_path = os.path.join(directory, "nodes.yaml")
+    template_path = os.path.join(directory, "template.yaml")
+    with open(template_path, "w") as file:
+        file.write(TEMPLATE)
+
+    def write_nodes_file(editor):
+        editor.load_template_file(template_path)
+        editor.write_nodes_file(nodes_path)
+
+    def apply_nodes(editor):
+        editor.load_nodes_file(nodes_path)
+        editor.apply_nodes()
+
+    return [
+        ("read", lambda editor: editor.read(scene_path)),
+        ("write", lambda editor: editor.write(os.path.join(directory, "output.wrl"))),
+        ("write_nodes_file", write_nodes_file),
+        ("apply_nodes", apply_nodes),
+        ("convert", lambda editor: editor.convert("iv")),
+        ("delete", lambda editor: editor.delete("Material"))
+    ]
+
+
+def run(directory, memory):
+    # Seconds, or peak traced heap in MB, for each operation
+    results = {}
+    editor = IVEditor(metrics=Metrics.silent())
+    for name, operation in operations(directory):
+        if memory:
+            tracemalloc.reset_peak()
+            operation(editor)
+            results[name] = tracemalloc.get_traced_memory()[1] / (1 << 20)
+        else:
+            start = time.perf_counter()
+            operation(editor)
+            results[name] = time.perf_counter() - start
+    return results
+
+
+def measure(args):
+    with tempfile.TemporaryDirectory() as directory:
+        generator = SceneGenerator(points=args.points, depth=args.depth, def_density=args.def_density)
+        shapes = generator.write(os.path.join(directory, "scene.wrl"), nodes=args.nodes)
+        # Best of the repeats, as the others are slowed by whatever else the machine is doing
+        timings = [run(directory, False) for _ in range(args.repeat)]
+        results = {name: {"seconds": min(timing[name] for timing in timings)} for name in timings[0]}
+        if args.memory:
+            tracemalloc.start()
+            for name, peak in run(directory, True).items():
+                results[name]["peak_mb"] = peak
+            tracemalloc.stop()
+    return shapes, results
+
+
+def commit():
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def results_path(label):
+    return os.path.join(RESULTS_DIR, "%s.json" % label)
+
+
+def compare(results, previous, threshold):
+    # Prints the change against previous results and returns the operations that slowed down
+    regressions = []
+    print("against %s" % previous["label"])
+    for name, result in results.items():
+        if name not in previous["results"]:
+            continue
+        seconds = previous["results"][name]["seconds"]
+        ratio = result["seconds"] / seconds
+        flag = ""
+        if ratio > threshold and max(seconds, result["seconds"]) >= MIN_SECONDS:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("  %-16s %6.2fx%s" % (name, ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVEditor operations on a synthetic scene, with results kept per commit")
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--depth", type=int, default=2, help="Transform levels around each group of shapes")
+    parser.add_argument("--def-density", type=float, default=0.5, help="Share of shapes with DEF names")
+    parser.add_argument("--points", type=int, default=20, help="Points in each coordinate array")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the slower traced memory run")
+    parser.add_argument("--label", help="Name of the stored results, the current commit by default")
+    parser.add_argument("--compare", help="Label of stored results to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    shapes, results = measure(args)
+    print("%i nodes, %i shapes, depth %i, DEF density %.2f, %i points" % (
+        args.nodes, shapes, args.depth, args.def_density, args.points
+    ))
+    for name, result in results.items():
+        peak = " peak %8.1f MB" % result["peak_mb"] if "peak_mb" in result else ""
+        print("  %-16s %8.3fs%s" % (name, result["seconds"], peak))
+
+    label = args.label or commit() or "latest"
+    parameters = {key: getattr(args, key) for key in ("nodes", "depth", "def_density", "points")}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(results_path(label), "w") as file:
+        json.dump({"label": label, "parameters": parameters, "results": results}, file, indent=2)
+    print("saved %s" % results_path(label))
+
+    if args.compare:
+        with open(results_path(args.compare)) as file:
+            previous = json.load(file)
+        if previous["parameters"] != parameters:
+            print("warning: %s was measured with %s" % (args.compare, previous["parameters"]))
+        if compare(results, previous, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_parser import parse, parse_size
+from benchmarks.synthetic import SceneGenerator
+from ivtools.traverse import walk
+from ivtools.writer import IVWriter
+
+MODES = {"strings": (False, False), "text": (True, False), "numpy": (True, True)}
+
+
+def resolve(data):
+    # Parses every array that was left as text, as using each one would
+    walk(data, field=lambda node, name, depth: node.get_field(name))
+
+
+def measure(file_path, numeric, used):
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = parse(file_path, numeric=numeric)
+    if used:
+        resolve(data)
+    read_time = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    output = file_path + ".out"
+    start = time.perf_counter()
+    with open(output, "w") as file:
+        IVWriter(file).write_data(data)
+    write_time = time.perf_counter() - start
+    os.remove(output)
+    return current, read_time, write_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and time of string, unparsed and NumPy array fields")
+    parser.add_argument("--size", default="20MB")
+    parser.add_argument("--points", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=args.points).write(file_path, parse_size(args.size))
+        for mode, (numeric, used) in MODES.items():
+            memory, read_time, write_time = measure(file_path, numeric, used)
+            print("%-7s resident %8.1f MB  read %6.2fs  write %6.2fs" % (mode, memory / (1 << 20), read_time, write_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.synthetic import SceneGenerator
+from ivtools.editor import IVEditor
+from ivtools.namespace import Namespace
+
+
+def edits(count, shapes, seed=0):
+    rand = random.Random(seed)
+    return [
+        Namespace({"part_%i" % rand.randrange(shapes): {"Material": {"transparency": "%.2f" % rand.random()}}})
+        for _ in range(count)
+    ]
+
+
+def timed_edits(editor, new_nodes, indexed):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for nodes in new_nodes:
+            if indexed:
+                editor.index.apply_nodes(nodes)
+            else:
+                editor.data.DATA.apply_nodes(nodes)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Targeted edits through the node index versus full traversals")
+    parser.add_argument("--shapes", type=int, default=25000, help="Each shape converts to 4 nodes")
+    parser.add_argument("--edits", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=3).write(file_path, shapes=args.shapes)
+        outputs = []
+        for indexed in (False, True):
+            editor = IVEditor()
+            editor.read(file_path)
+            editor.convert("iv")
+            nodes = len(editor.index)
+            elapsed = timed_edits(editor, edits(args.edits, args.shapes), indexed)
+            print("%-9s %i nodes  %i edits  %8.3fs" % ("index" if indexed else "traversal", nodes, args.edits, elapsed))
+            output = io.StringIO()
+            editor.write(output)
+            outputs.append(output.getvalue())
+        assert outputs[0] == outputs[1], "Indexed edits changed the output"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import io
+import random
+import time
+import tracemalloc
+
+from benchmarks.bench_convert import geometry_counts
+from ivtools.convert import get_converter
+from ivtools.instance import Instancer
+from ivtools.parser import IVParser
+from ivtools.writer import IVWriter
+
+HEADER = "#VRML V2.0 utf8"
+
+
+def fastener(rand, points):
+    # One kind of fastener: a fan of triangles with its own colour
+    lines = [
+        "      Shape {\n",
+        "        appearance Appearance {\n",
+        "          material Material {\n",
+        "            diffuseColor %.3f %.3f %.3f\n" % (rand.random(), rand.random(), rand.random()),
+        "          }\n",
+        "        }\n",
+        "        geometry IndexedFaceSet {\n",
+        "          coord Coordinate {\n",
+        "            point [\n"
+    ]
+    lines += ["              %.6f %.6f %.6f,\n" % (rand.random(), rand.random(), rand.random()) for _ in range(points)]
+    lines += ["            ]\n", "          }\n", "          coordIndex [\n"]
+    lines += ["            0, %i, %i, -1,\n" % (i + 1, i + 2) for i in range(points - 2)]
+    lines += ["          ]\n", "        }\n", "      }\n"]
+    return "".join(lines)
+
+
+def assembly(parts, kinds, points, seed=0):
+    # Parts placed by their own transforms, each holding a copy of one of a few fasteners
+    rand = random.Random(seed)
+    shapes = [fastener(rand, points) for _ in range(kinds)]
+    text = [HEADER, "\n\n"]
+    for i in range(parts):
+        text.append("DEF part_%i Transform {\n  translation %i 0 0\n  children [\n" % (i, i))
+        text.append(shapes[rand.randrange(kinds)])
+        text.append("  ]\n}\n")
+    return "".join(text)
+
+
+def measure(text, instance):
+    # Parse, instance, convert and write times, the written and converted text and the geometry
+    start = time.perf_counter()
+    _, data = IVParser().read(io.StringIO(text))
+    times = [time.perf_counter() - start]
+    start = time.perf_counter()
+    report = Instancer().instance_data(data) if instance else None
+    times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    new_data = get_converter("iv").convert_data(data)
+    times.append(time.perf_counter() - start)
+    output = io.StringIO()
+    start = time.perf_counter()
+    IVWriter(output).write(HEADER, data)
+    times.append(time.perf_counter() - start)
+    converted = io.StringIO()
+    IVWriter(converted).write("#Inventor V2.1 ascii", new_data)
+    return times, output.getvalue(), converted.getvalue(), geometry_counts(data), report
+
+
+def footprint(text, instance):
+    # Memory the parsed tree holds, measured apart as tracing slows everything down
+    tracemalloc.start()
+    _, data = IVParser().read(io.StringIO(text))
+    if instance:
+        Instancer().instance_data(data)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse, convert and write an assembly of repeated fasteners, with and "
+                                                 "without instancing")
+    parser.add_argument("--parts", type=int, default=20000)
+    parser.add_argument("--kinds", type=int, default=20, help="Distinct fasteners")
+    parser.add_argument("--points", type=int, default=50)
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip measuring tree memory")
+    args = parser.parse_args()
+
+    print("%-10s %8s %8s %8s %8s %10s %10s %10s" % (
+        "", "parse", "instance", "convert", "write", "memory", "output", "converted"
+    ))
+    text = assembly(args.parts, args.kinds, args.points)
+    expected = None
+    # The instanced output is read back too, with its USE references shared as they are parsed
+    for label, instance in (("copies", False), ("instanced", True), ("reread", False)):
+        times, output, converted, counts, report = measure(text, instance)
+        memory = footprint(text, instance) if args.memory else 0
+        print("%-10s %7.3fs %7.3fs %7.3fs %7.3fs %8.1fMB %8.1fMB %8.1fMB" % (
+            (label,) + tuple(times) + (memory / 1e6, len(output) / 1e6, len(converted) / 1e6)
+        ))
+        if report is not None:
+            print("%10s %s" % ("", report))
+            text = output
+        expected = counts if expected is None else expected
+        assert counts == expected, "Instancing changed the geometry"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_parser import parse_size
+from benchmarks.synthetic import SceneGenerator
+from ivtools.editor import IVEditor
+from ivtools.metrics import Metrics
+
+
+def delete_job(file_path, output_path, mapped):
+    # Read, delete one node and write, as a batch job would
+    start = time.perf_counter()
+    editor = IVEditor(metrics=Metrics.silent(), mapped=mapped)
+    editor.read(file_path)
+    node = editor.data.DATA.nodes()[0]
+    editor.data.DATA.remove_node(node)
+    editor.index.remove(node)
+    editor.write(output_path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete-one-node jobs with eager and memory-mapped reads")
+    parser.add_argument("--size", default="200MB")
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--memory", action="store_true", help="Also trace peak heap use, which is slow for eager reads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=args.points).write(file_path, parse_size(args.size))
+        for mapped in (False, True):
+            output_path = os.path.join(directory, "output.wrl")
+            elapsed = delete_job(file_path, output_path, mapped)
+            print("%-6s %8.3fs  output %8.1f MB" % (
+                "mapped" if mapped else "eager", elapsed, os.path.getsize(output_path) / (1 << 20)
+            ))
+            if args.memory:
+                # Mapped pages belong to the file, so only heap allocations are counted
+                tracemalloc.start()
+                delete_job(file_path, output_path, mapped)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print("       peak heap %8.1f MB" % (peak / (1 << 20)))
+
+
+if __name__ == "__main__":
+    main()
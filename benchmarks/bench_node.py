@@ -0,0 +1,54 @@
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import SceneGenerator
+from ivtools.events import END, FIELD, START
+from ivtools.namespace import Namespace
+from ivtools.parser import IVParser
+
+
+def legacy_build(events):
+    # The dict-backed Namespace tree that Node replaced, kept for comparison
+    data = Namespace()
+    sub_space = []
+    for event in events:
+        if event[0] == START:
+            node = "NODE_%i" % len(data.get(sub_space))
+            data.add({node: {"NAME": event[1], "COMMENT": event[2], "CHILDREN": {}}}, sub_space=sub_space)
+            sub_space = sub_space + [node, "CHILDREN"]
+        elif event[0] == FIELD:
+            data.add({event[1]: event[2]}, sub_space=sub_space)
+        elif event[0] == END:
+            sub_space = sub_space[:-2]
+    return data
+
+
+def measure(file_path, build):
+    with open(file_path, "r") as file:
+        events = list(IVParser().events(file))
+    nodes = sum(1 for event in events if event[0] == START)
+    tracemalloc.start()
+    data = build(iter(events))
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return nodes, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-node memory of Node trees versus Namespace trees")
+    parser.add_argument("--shapes", type=int, default=200000, help="Each shape has 5 nodes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=3).write(file_path, shapes=args.shapes)
+        for label, build in (("namespace", legacy_build), ("node", IVParser.build)):
+            nodes, memory = measure(file_path, build)
+            print("%-9s %8i nodes %8.1f MB  %6.0f bytes/node" % (label, nodes, memory / (1 << 20), memory / nodes))
+
+
+if __name__ == "__main__":
+    main()
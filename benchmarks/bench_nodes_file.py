@@ -0,0 +1,64 @@
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import SceneGenerator
+from ivtools.editor import IVEditor
+from ivtools.namespace import load_yaml
+
+
+def legacy_write_nodes_file(editor, file_path):
+    # The list-deduplicating writer that write_nodes_file replaced, kept for comparison
+    nodes = editor.data.DATA.get_nodes()
+    written = []
+    with open(file_path, "w") as file:
+        for node in nodes:
+            if node not in written:
+                written.append(node)
+                file.write("%s:\n" % node)
+                for key, fields in editor.template_nodes.get().items():
+                    file.write("%s%s:\n" % (" " * 2, key))
+                    for field, value in fields.get().items():
+                        file.write("%s%s: %s\n" % (" " * 4, field, "" if value is None else value))
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nodes file generation time")
+    parser.add_argument("--shapes", type=int, default=20000)
+    parser.add_argument("--template", required=True)
+    parser.add_argument("--legacy-max", type=int, default=50000, help="Skip the legacy writer above this many shapes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=3).write(file_path, shapes=args.shapes)
+        editor = IVEditor()
+        editor.read(file_path)
+        editor.convert("iv")
+        editor.load_template_file(args.template)
+        expected = None
+        if args.shapes <= args.legacy_max:
+            legacy_path = os.path.join(directory, "legacy.yaml")
+            print("legacy %8.3fs" % timed(legacy_write_nodes_file, editor, legacy_path))
+            with open(legacy_path) as file:
+                expected = file.read()
+        loaded = []
+        for style in ("block", "flow", "json"):
+            nodes_path = os.path.join(directory, "nodes_%s.yaml" % style)
+            print("%-6s %8.3fs" % (style, timed(editor.write_nodes_file, nodes_path, style=style)))
+            if style == "block" and expected is not None:
+                with open(nodes_path) as file:
+                    assert file.read() == expected, "Block nodes file differs from the legacy output"
+            loaded.append(load_yaml(nodes_path))
+        assert len(loaded[0]) == args.shapes and loaded[0] == loaded[1] == loaded[2], "Nodes file styles disagree"
+
+
+if __name__ == "__main__":
+    main()
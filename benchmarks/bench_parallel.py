@@ -0,0 +1,53 @@
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.bench_parser import parse_size
+from benchmarks.synthetic import SceneGenerator
+from ivtools.parallel import ParallelParser
+from ivtools.parser import IVParser
+from ivtools.writer import IVWriter
+
+
+def timed_read(parser, file_path):
+    start = time.perf_counter()
+    with open(file_path, "r", encoding="utf8", errors='ignore') as file:
+        header, data = parser.read(file)
+    return time.perf_counter() - start, header, data
+
+
+def written(header, data):
+    output = io.StringIO()
+    output.write(header)
+    IVWriter(output).write_data(data)
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial against parallel parsing of top-level nodes")
+    parser.add_argument("--size", default="100MB")
+    parser.add_argument("--points", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=args.points).write(file_path, parse_size(args.size))
+        text = open(file_path).read()
+        start = time.perf_counter()
+        chunks = sum(1 for _ in ParallelParser().chunks(text))
+        print("scan     %8.3fs  %i chunks" % (time.perf_counter() - start, chunks))
+        serial_time, header, data = timed_read(IVParser(), file_path)
+        print("serial   %8.3fs" % serial_time)
+        expected = written(header, data)
+        del data
+        for workers in sorted(set(args.workers)):
+            elapsed, header, data = timed_read(ParallelParser(workers), file_path)
+            assert written(header, data) == expected, "Parallel parse with %i workers differs" % workers
+            print("%2i workers %6.3fs  speedup %.2fx" % (workers, elapsed, serial_time / elapsed))
+
+
+if __name__ == "__main__":
+    main()
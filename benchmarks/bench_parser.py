@@ -0,0 +1,108 @@
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import SceneGenerator
+from ivtools.events import END, FIELD, START, tree_events
+from ivtools.namespace import Namespace
+from ivtools.parser import IVParser
+
+SIZES = {"KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+
+
+def legacy_parse(file_path):
+    # The per-character parser that IVParser replaced, kept for comparison
+    text = ""
+    sub_space = []
+    data = Namespace()
+    field_open = False
+    with open(file_path, "r", encoding="utf8", errors='ignore') as file:
+        for line in file.readlines():
+            if line.strip():
+                if sub_space and not field_open and not any([item in line for item in "{[(}])"]):
+                    data.add({line.strip().split()[0]: " ".join(line.strip().split()[1:])}, sub_space=sub_space)
+                else:
+                    for char in line.split("#")[0] + "\n" if "#" in line else line:
+                        if char == "{":
+                            name = " ".join(text.strip().split("\n")[-1].strip().split())
+                            comment = " ".join(line.split("#")[1:]).strip() if line.split("#")[1:] else None
+                            node = "NODE_%i" % len(data.get(sub_space))
+                            data.add({node: {"NAME": name, "COMMENT": comment, "CHILDREN": {}}}, sub_space=sub_space)
+                            sub_space = sub_space + [node, "CHILDREN"]
+                            text = ""
+                        elif char == "}":
+                            sub_space = sub_space[:-2]
+                            text = ""
+                        elif char == "[":
+                            text += char
+                            field_open = True
+                        elif char == "]":
+                            field_open = False
+                            name, value = text.split("[")
+                            name = name.split("{")[-1].strip()
+                            value = [" ".join(row.strip().split()) for row in value.split("\n") if row.strip()]
+                            data.add({name: value}, sub_space=sub_space)
+                            text = ""
+                        else:
+                            text += char
+    return data
+
+
+def legacy_events(data):
+    for name, item in data.get().items():
+        if name.startswith("NODE"):
+            yield START, item.NAME, item.COMMENT
+            yield from legacy_events(item.CHILDREN)
+            yield END,
+        else:
+            yield FIELD, name, item
+
+
+def parse(file_path, numeric=False):
+    with open(file_path, "r", encoding="utf8", errors='ignore') as file:
+        return IVParser(numeric=numeric).parse(file)
+
+
+def parse_size(size):
+    for unit, scale in SIZES.items():
+        if size.upper().endswith(unit):
+            return int(float(size[:-len(unit)]) * scale)
+    return int(size)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare IVParser against the legacy per-character parser")
+    parser.add_argument("--sizes", default="1MB,100MB,1GB")
+    parser.add_argument("--legacy-max", default="100MB", help="Skip the legacy parser above this size")
+    parser.add_argument("--points", type=int, default=100)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    legacy_max = parse_size(args.legacy_max)
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for size in args.sizes.split(","):
+            file_path = os.path.join(directory, "scene_%s.wrl" % size)
+            shapes = SceneGenerator(points=args.points).write(file_path, parse_size(size))
+            mb = os.path.getsize(file_path) / SIZES["MB"]
+            data, new_time = timed(parse, file_path)
+            line = "%8s %8i shapes  parser %8.2fs (%7.1f MB/s)" % (size, shapes, new_time, mb / new_time)
+            _, numeric_time = timed(parse, file_path, True)
+            line += "  numeric %8.2fs (%7.1f MB/s)" % (numeric_time, mb / numeric_time)
+            if parse_size(size) <= legacy_max:
+                old_data, old_time = timed(legacy_parse, file_path)
+                assert list(legacy_events(old_data)) == list(tree_events(data)), "Parsers disagree on %s" % file_path
+                line += "  legacy %8.2fs (%7.1f MB/s)  speedup %.1fx" % (old_time, mb / old_time, old_time / new_time)
+            print(line)
+            del data
+            os.remove(file_path)
+
+
+if __name__ == "__main__":
+    main()
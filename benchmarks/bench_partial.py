@@ -0,0 +1,58 @@
+import argparse
+import filecmp
+import os
+import tempfile
+import time
+
+from benchmarks.bench_parser import parse_size, timed
+from benchmarks.synthetic import SceneGenerator
+from ivtools.editor import IVEditor
+from ivtools.metrics import Metrics
+
+
+def partial_job(file_path, output_path, names, edit):
+    # Read the named parts, change one field of the first if edit is set, and write the whole file back
+    editor = IVEditor(metrics=Metrics.silent())
+    start = time.perf_counter()
+    editor.read(file_path, names=names)
+    read_time = time.perf_counter() - start
+    if edit:
+        editor.find(def_name=names[0])[0].nodes()[0].nodes()[0].set_field("ambientIntensity", "0.5")
+    start = time.perf_counter()
+    editor.write(output_path)
+    return len(editor.data.DATA.nodes()), read_time, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read a few named parts of a large file and splice them back")
+    parser.add_argument("--size", default="1GB")
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--parts", type=int, default=10)
+    parser.add_argument("--full", action="store_true", help="Also time a full read, which takes much longer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        # Every tenth shape is named, as in a scene where only the parts of an assembly are
+        shapes = SceneGenerator(points=args.points, def_density=0.1).write(file_path, parse_size(args.size))
+        step = max(shapes // args.parts // 10, 1) * 10
+        names = ["part_%i" % n for n in range(9, shapes, step)][:args.parts]
+        print("%i shapes, %.1f MB" % (shapes, os.path.getsize(file_path) / (1 << 20)))
+        if args.full:
+            _, seconds = timed(IVEditor(metrics=Metrics.silent()).read, file_path)
+            print("%-10s read %8.3fs" % ("full", seconds))
+        output_path = os.path.join(directory, "output.wrl")
+        for edit in (False, True):
+            count, read_time, write_time = partial_job(file_path, output_path, names, edit)
+            print("%-10s read %8.3fs  write %8.3fs  %i parts" % (
+                "edited" if edit else "unchanged", read_time, write_time, count
+            ))
+            if not edit:
+                assert filecmp.cmp(file_path, output_path, shallow=False), "Unchanged parts were not copied as they were"
+        editor = IVEditor(metrics=Metrics.silent())
+        editor.read(output_path, names=names[:1])
+        assert editor.data.DATA.nodes()[0].nodes()[0].nodes()[0].fields["ambientIntensity"] == "0.5"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_parser import parse_size
+from benchmarks.synthetic import SceneGenerator
+from ivtools.metrics import Metrics
+from ivtools.stream import StreamEditor
+
+# The peak heap of the largest file may be at most this many times that of the smallest
+FLAT = 1.5
+
+
+def convert_job(file_path, output_path, ext):
+    # Streamed conversion, traced for the peak heap it holds
+    tracemalloc.start()
+    start = time.perf_counter()
+    editor = StreamEditor(metrics=Metrics.silent())
+    editor.read(file_path)
+    editor.convert(ext)
+    editor.write(output_path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak heap of streamed conversion as the file grows")
+    parser.add_argument("--sizes", default="2MB,8MB,32MB")
+    parser.add_argument("--points", type=int, default=100)
+    parser.add_argument("--def-density", type=float, default=0.0, help="Share of shapes with DEF names")
+    args = parser.parse_args()
+
+    peaks = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes.split(","):
+            file_path = os.path.join(directory, "scene.wrl")
+            shapes = SceneGenerator(points=args.points, def_density=args.def_density).write(file_path, parse_size(size))
+            elapsed, peak = convert_job(file_path, os.path.join(directory, "scene.iv"), "iv")
+            peaks.append(peak)
+            print("%8s %8i shapes  %8.2fs  peak heap %8.2f MB" % (size, shapes, elapsed, peak / (1 << 20)))
+    # Only the stand-ins kept for DEF names grow with the file
+    if not args.def_density:
+        assert peaks[-1] <= FLAT * peaks[0], "Streamed conversion held more memory as the file grew"
+
+
+if __name__ == "__main__":
+    main()
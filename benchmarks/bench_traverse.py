@@ -0,0 +1,109 @@
+import argparse
+import pickle
+import time
+
+from ivtools.events import END, FIELD, START, tree_events
+from ivtools.node import Node
+from ivtools.writer import IVWriter
+
+
+class Sink(object):
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+
+
+def chain(depth):
+    root = Node()
+    node = root
+    for i in range(depth):
+        child = Node("DEF part_%i Transform" % i, fields={"scale": "1 1 1"})
+        node.add_node(child)
+        node = child
+    node.add_node(Node("Shape"))
+    return root
+
+
+def wide(count, width=1000):
+    root = Node()
+    for i in range(count // width):
+        group = Node("DEF group_%i Group" % i)
+        for j in range(width - 1):
+            group.add_node(Node("Shape", fields={"size": "1 1 1"}))
+        root.add_node(group)
+    return root
+
+
+def legacy_events(node):
+    # The recursive traversals the explicit-stack versions replaced, kept for comparison
+    for child in node.children:
+        if child.__class__ is str:
+            yield FIELD, child, node.fields[child]
+        else:
+            yield START, child.name, child.comment
+            yield from legacy_events(child)
+            yield END,
+
+
+def legacy_def_names(node):
+    for child in node.nodes():
+        if child.def_name is not None:
+            yield child.def_name
+        yield from legacy_def_names(child)
+
+
+def legacy_delete(node, name):
+    for child in node.nodes():
+        if child.name == name:
+            node.children.remove(child)
+        else:
+            legacy_delete(child, name)
+
+
+def legacy_write(writer, node, depth=0):
+    for child in node.children:
+        if child.__class__ is str:
+            writer.write_field(child, node.fields[child], depth)
+        else:
+            writer.write_start(child.name, child.comment, depth)
+            legacy_write(writer, child, depth + 1)
+            writer.write_end(depth)
+
+
+OPERATIONS = [
+    ("events", lambda root: sum(1 for _ in legacy_events(root)), lambda root: sum(1 for _ in tree_events(root))),
+    ("def names", lambda root: len(list(legacy_def_names(root))), lambda root: len(root.get_nodes())),
+    ("delete", lambda root: legacy_delete(root, "Missing"), lambda root: root.delete("Missing")),
+    ("write", lambda root: legacy_write(IVWriter(Sink()), root), lambda root: IVWriter(Sink()).write_data(root)),
+    ("pickle", None, lambda root: pickle.loads(pickle.dumps(root, protocol=5)))
+]
+
+
+def timed(function, root):
+    if function is None:
+        return "-"
+    start = time.perf_counter()
+    try:
+        function(root)
+    except RecursionError:
+        return "RecursionError"
+    return "%.3fs" % (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recursive against explicit-stack traversals on deep and wide trees")
+    parser.add_argument("--depth", type=int, default=10000)
+    parser.add_argument("--nodes", type=int, default=1000000)
+    args = parser.parse_args()
+
+    for label, root in (("chain %i deep" % args.depth, chain(args.depth)), ("wide %i nodes" % args.nodes, wide(args.nodes))):
+        print(label)
+        for operation, legacy, current in OPERATIONS:
+            print("  %-10s recursive %15s   explicit stack %15s" % (operation, timed(legacy, root), timed(current, root)))
+
+
+if __name__ == "__main__":
+    main()
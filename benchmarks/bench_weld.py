@@ -0,0 +1,60 @@
+import argparse
+import time
+
+import numpy as np
+
+from ivtools.node import Node
+from ivtools.weld import Welder
+
+
+def soup(shapes, vertices, unused, seed=0):
+    # VRML face sets as exporters often write them: every triangle with its own copies of corners it shares
+    # with others, followed by points no face uses
+    rand = np.random.default_rng(seed)
+    root = Node()
+    triangles = vertices // 3
+    for i in range(shapes):
+        corners = rand.integers(0, 8, (triangles, 3, 3)).astype(np.float32) * np.float32(0.25)
+        points = np.concatenate([corners.reshape(-1, 3), rand.random((unused, 3), np.float32)])
+        index = np.full((triangles, 4), -1, np.int32)
+        index[:, :3] = np.arange(triangles * 3, dtype=np.int32).reshape(-1, 3)
+        coord = Node("coord Coordinate", fields={"point": points})
+        geometry = Node("geometry IndexedFaceSet", fields={"coordIndex": index.ravel()})
+        geometry.add_node(coord)
+        shape = Node("Shape", "part_%i" % i)
+        shape.add_node(geometry)
+        root.add_node(shape)
+    return root
+
+
+def faces(data):
+    # The corner coordinates of every face, which welding exact duplicates must not change
+    corners = []
+    for shape in data.nodes():
+        geometry = shape.nodes()[0]
+        index = geometry.get_field("coordIndex")
+        corners.append(geometry.nodes()[0].get_field("point")[index[index >= 0]])
+    return np.concatenate(corners)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vertex welding and pruning on a triangle soup")
+    parser.add_argument("--vertices", type=int, default=10000000, help="Points in the scene, about")
+    parser.add_argument("--shapes", type=int, default=10000)
+    parser.add_argument("--unused", type=float, default=0.1, help="Share of the points no face uses")
+    parser.add_argument("--tolerance", type=float, default=0.0)
+    args = parser.parse_args()
+
+    per_shape = args.vertices // args.shapes
+    unused = int(per_shape * args.unused)
+    data = soup(args.shapes, per_shape - unused, unused)
+    expected = faces(data) if not args.tolerance else None
+    start = time.perf_counter()
+    report = Welder(args.tolerance).weld_data(data)
+    print("%8.3fs  %s" % (time.perf_counter() - start, report))
+    if expected is not None:
+        assert np.array_equal(faces(data), expected), "Welding changed the faces"
+
+
+if __name__ == "__main__":
+    main()
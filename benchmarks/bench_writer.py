@@ -0,0 +1,104 @@
+import argparse
+import builtins
+import filecmp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.bench_parser import parse, parse_size
+from benchmarks.synthetic import SceneGenerator
+from ivtools.fields import format_array
+from ivtools.node import Node
+from ivtools.writer import IVWriter
+
+
+def legacy_write(node, file_path, tab_size=2, tabs=0):
+    # The open-per-line writer that IVWriter replaced, kept for comparison
+    for child in node.children:
+        if child.__class__ is Node:
+            with open(file_path, "a") as file:
+                if child.comment is None:
+                    file.write("%s%s {\n" % (" " * tabs * tab_size, child.name))
+                else:
+                    file.write("%s%s { # %s\n" % (" " * tabs * tab_size, child.name, child.comment))
+            legacy_write(child, file_path, tab_size=tab_size, tabs=tabs + 1)
+            with open(file_path, "a") as file:
+                file.write("%s}\n" % (" " * tabs * tab_size))
+        else:
+            name, data = child, node.fields[child]
+            with open(file_path, "a") as file:
+                if isinstance(data, list):
+                    if len(data) == 1:
+                        file.write("%s%s [ %s ]\n" % (" " * tabs * tab_size, name, data[0]))
+                    else:
+                        file.write(
+                            "%s%s [\n%s\n%s]\n" % (
+                                " " * tabs * tab_size,
+                                name,
+                                "\n".join(["%s%s" % (" " * tab_size * (tabs + 1), item) for item in data]),
+                                " " * tabs * tab_size
+                            )
+                        )
+                elif isinstance(data, np.ndarray):
+                    values = format_array(data, " " * tab_size * (tabs + 1))
+                    if "\n" in values:
+                        file.write("%s%s [\n%s\n%s]\n" % (" " * tabs * tab_size, name, values, " " * tabs * tab_size))
+                    else:
+                        file.write("%s%s [ %s ]\n" % (" " * tabs * tab_size, name, values.strip()))
+                else:
+                    file.write("%s%s %s\n" % (" " * tabs * tab_size, name, data))
+
+
+def legacy_editor_write(header, data, file_path):
+    with open(file_path, "w") as file:
+        file.writelines("%s\n\n" % header)
+    legacy_write(data, file_path)
+
+
+def editor_write(header, data, file_path):
+    with open(file_path, "w", buffering=1 << 20) as file:
+        IVWriter(file).write(header, data)
+
+
+def counted(function, *args):
+    # Count file opens and wall-clock time of a writer
+    opens = [0]
+    builtin_open = builtins.open
+
+    def counting_open(*open_args, **open_kwargs):
+        opens[0] += 1
+        return builtin_open(*open_args, **open_kwargs)
+
+    builtins.open = counting_open
+    try:
+        start = time.perf_counter()
+        function(*args)
+        return opens[0], time.perf_counter() - start
+    finally:
+        builtins.open = builtin_open
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare IVWriter against the legacy open-per-line writer")
+    parser.add_argument("--size", default="20MB")
+    parser.add_argument("--points", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "scene.wrl")
+        SceneGenerator(points=args.points).write(file_path, parse_size(args.size))
+        data = parse(file_path, numeric=True)
+        header = "#VRML V2.0 utf8"
+        old_path = os.path.join(directory, "legacy.wrl")
+        new_path = os.path.join(directory, "writer.wrl")
+        old_opens, old_time = counted(legacy_editor_write, header, data, old_path)
+        new_opens, new_time = counted(editor_write, header, data, new_path)
+        assert filecmp.cmp(old_path, new_path, shallow=False), "Writers disagree"
+        print("legacy %8i opens %8.2fs" % (old_opens, old_time))
+        print("writer %8i opens %8.2fs  speedup %.1fx" % (new_opens, new_time, old_time / new_time))
+
+
+if __name__ == "__main__":
+    main()
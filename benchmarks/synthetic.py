@@ -0,0 +1,82 @@
+import random
+
+HEADER = "#VRML V2.0 utf8\n\n"
+
+
+# Nodes in each shape: Shape, appearance, material, geometry and coord
+SHAPE_NODES = 5
+
+
+class SceneGenerator(object):
+
+    # Scenes of the same parameters are the same, byte for byte. Every group of shapes sits depth
+    # Transform { children [ ... ] } levels down, and def_density of the shapes have DEF names
+
+    def __init__(self, points=100, seed=0, depth=0, def_density=0.0, group=10):
+        self.points = points
+        self.seed = seed
+        self.depth = depth
+        self.def_density = def_density
+        self.group = group
+
+    def shape(self, rand, n):
+        # Spread evenly rather than drawn, so the other values do not depend on the density
+        named = int((n + 1) * self.def_density) > int(n * self.def_density)
+        lines = [
+            "%sShape { # part_%i\n" % ("DEF part_%i " % n if named else "", n),
+            "  appearance Appearance {\n",
+            "    material Material {\n",
+            "      diffuseColor %.3f %.3f %.3f\n" % (rand.random(), rand.random(), rand.random()),
+            "      ambientIntensity 0.2\n",
+            "    }\n",
+            "  }\n",
+            "  geometry IndexedFaceSet {\n",
+            "    ccw TRUE\n",
+            "    solid FALSE\n",
+            "    coord Coordinate {\n",
+            "      point [\n"
+        ]
+        for _ in range(self.points):
+            lines.append(
+                "        %.6f %.6f %.6f,\n" % (rand.uniform(-1e3, 1e3), rand.uniform(-1e3, 1e3), rand.uniform(-1e3, 1e3))
+            )
+        lines += [
+            "      ]\n",
+            "    }\n",
+            "    coordIndex [\n"
+        ]
+        for i in range(self.points - 2):
+            lines.append("      %i, %i, %i, -1,\n" % (0, i + 1, i + 2))
+        lines += [
+            "    ]\n",
+            "  }\n",
+            "}\n"
+        ]
+        return "".join(lines)
+
+    def group_nodes(self):
+        # Nodes of a full group, counting each children list as a node as the parser does
+        return self.group * SHAPE_NODES + 2 * self.depth
+
+    def write(self, file_path, size=None, shapes=None, nodes=None):
+        # Stops at whichever of size bytes, shapes shapes or about nodes nodes comes first
+        if nodes is not None:
+            groups, rest = divmod(nodes, self.group_nodes())
+            total = groups * self.group + max(0, rest - 2 * self.depth) // SHAPE_NODES
+            shapes = total if shapes is None else min(shapes, total)
+        rand = random.Random(self.seed)
+        written = 0
+        n = 0
+        with open(file_path, "w") as file:
+            written += file.write(HEADER)
+            while (size is None or written < size) and (shapes is None or n < shapes):
+                if self.depth:
+                    written += file.write("Transform {\n  children [\n" * self.depth)
+                for _ in range(self.group if self.depth else 1):
+                    written += file.write(self.shape(rand, n))
+                    n += 1
+                    if shapes is not None and n >= shapes:
+                        break
+                if self.depth:
+                    written += file.write("  ]\n}\n" * self.depth)
+        return n
@@ -0,0 +1,174 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ivtools.cache import ParseCache
+from ivtools.editor import IVEditor
+from ivtools.files import COMPRESS_LEVEL, split_ext
+from ivtools.metrics import Metrics
+from ivtools.stream import StreamEditor
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_NO_INPUT = 2
+
+
+def find_files(inputs, pattern):
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files += sorted(glob.glob(os.path.join(item, pattern)))
+        else:
+            files += sorted(glob.glob(item))
+    return files
+
+
+def output_path(file_path, output_dir, operations, compress=None):
+    # Outputs are compressed like their inputs unless compress is set, and get a .gz extension if they are
+    name, ext, compressed = split_ext(os.path.basename(file_path))
+    for operation, argument in operations:
+        if operation == "convert":
+            ext = "." + argument
+    if compress if compress is not None else compressed:
+        ext += ".gz"
+    return os.path.join(output_dir, name + ext)
+
+
+def process(file_path, output_dir, operations, stream=False, verbose=False, cache_dir=None, compress=None,
+            level=COMPRESS_LEVEL, mapped=False, binary=None, names=None, types=None):
+    # Workers do not share the parent's logging setup or print to its stdout, so verbose messages are returned
+    # with the result and printed by the parent under the line for the file
+    start = time.perf_counter()
+    messages = []
+    metrics = Metrics(callback=lambda level, message: messages.append(message)) if verbose else Metrics.silent()
+    try:
+        output = output_path(file_path, output_dir, operations, compress)
+        if os.path.exists(output) and os.path.samefile(output, file_path):
+            raise ValueError("Output would replace its input: %s" % output)
+        if stream:
+            editor = StreamEditor(metrics=metrics, mapped=mapped)
+        else:
+            editor = IVEditor(
+                cache=None if cache_dir is None else ParseCache(cache_dir), metrics=metrics, mapped=mapped
+            )
+        if names or types:
+            editor.read(file_path, names, types)
+        else:
+            editor.read(file_path)
+        for operation, argument in operations:
+            if operation == "delete":
+                editor.delete(argument)
+            elif operation == "apply_nodes":
+                editor.load_nodes_file(argument)
+                editor.apply_nodes()
+            elif operation == "convert":
+                editor.convert(argument)
+            elif operation == "weld":
+                editor.weld(argument)
+            elif operation == "instance":
+                editor.instance()
+        if binary is None:
+            editor.write(output, level=level)
+        else:
+            editor.write(output, level=level, binary=binary)
+        error = None
+    except Exception as e:
+        error = "%s: %s" % (type(e).__name__, e)
+    return file_path, os.path.getsize(file_path), time.perf_counter() - start, error, metrics.summary(), messages
+
+
+def run(files, output_dir, operations, workers=None, stream=False, verbose=False, cache_dir=None, compress=None,
+        level=COMPRESS_LEVEL, mapped=False, binary=None, names=None, types=None):
+    os.makedirs(output_dir, exist_ok=True)
+    failures = 0
+    total_size = 0
+    totals = Metrics.silent()
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                process, file_path, output_dir, operations, stream, verbose, cache_dir, compress, level, mapped,
+                binary, names, types
+            ): file_path
+            for file_path in files
+        }
+        for future in as_completed(futures):
+            try:
+                file_path, size, seconds, error, summary, messages = future.result()
+            except Exception as e:
+                file_path, size, seconds, error = futures[future], 0, 0.0, "%s: %s" % (type(e).__name__, e)
+                summary = {"counters": {}, "timers": {}}
+                messages = []
+            total_size += size
+            totals.merge(summary)
+            if error is None:
+                print("OK   %8.2fs %8.1f MB  %s" % (seconds, size / (1 << 20), file_path))
+            else:
+                failures += 1
+                print("FAIL %8.2fs %8.1f MB  %s  %s" % (seconds, size / (1 << 20), file_path, error))
+            for message in messages:
+                print("     %s" % message)
+    elapsed = time.perf_counter() - start
+    print(
+        "%i files, %i failed, %.1f MB in %.2fs (%.1f MB/s)" % (
+            len(files), failures, total_size / (1 << 20), elapsed, total_size / (1 << 20) / elapsed
+        )
+    )
+    if verbose:
+        print(totals)
+    return EXIT_FAILURES if failures else EXIT_OK
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Apply editor operations to many files in parallel. "
+                    "Operations run in the order they are given on the command line."
+    )
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("--pattern", default="*.wrl", help="File pattern used inside input directories")
+    parser.add_argument("--delete", dest="operations", action="append", type=lambda x: ("delete", x), metavar="NODE")
+    parser.add_argument("--apply-nodes", dest="operations", action="append", type=lambda x: ("apply_nodes", x), metavar="FILE")
+    parser.add_argument("--convert", dest="operations", action="append", type=lambda x: ("convert", x), metavar="EXT")
+    parser.add_argument("--weld", dest="operations", action="append", type=lambda x: ("weld", float(x)), metavar="TOLERANCE",
+                        help="Weld the points of each face set on a grid of this size (0 for exact duplicates)")
+    parser.add_argument("--instance", dest="operations", action="append_const", const=("instance", None),
+                        help="Write repeated identical subtrees once, then as USE references")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--stream", action="store_true", help="Filter each file as a stream instead of loading it")
+    parser.add_argument("--cache", default=None, metavar="DIR", help="Reuse parsed scenes cached in this directory")
+    parser.add_argument("--mmap", dest="mapped", action="store_true",
+                        help="Map each input and copy large arrays that are not edited without parsing them")
+    parser.add_argument("--compress", dest="compress", action="store_const", const=True, default=None,
+                        help="Gzip every output (default: only outputs of compressed inputs)")
+    parser.add_argument("--no-compress", dest="compress", action="store_const", const=False)
+    parser.add_argument("--level", type=int, default=COMPRESS_LEVEL, help="Gzip compression level")
+    parser.add_argument("--binary", dest="binary", action="store_const", const=True, default=None,
+                        help="Write Inventor outputs in the binary format (default: only outputs of binary inputs)")
+    parser.add_argument("--ascii", dest="binary", action="store_const", const=False)
+    parser.add_argument("--select", dest="names", action="append", metavar="NAME",
+                        help="Read only the nodes with this DEF name and copy the rest of each file as it is")
+    parser.add_argument("--select-type", dest="types", action="append", metavar="TYPE",
+                        help="Read only the nodes of this type and copy the rest of each file as it is")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    if args.stream and args.binary is not None:
+        parser.error("--binary and --ascii cannot be used with --stream")
+    if args.stream and (args.names or args.types):
+        parser.error("--select and --select-type cannot be used with --stream")
+
+    files = find_files(args.inputs, args.pattern)
+    if not files:
+        print("No input files found")
+        return EXIT_NO_INPUT
+    return run(
+        files, args.output_dir, args.operations or [], args.workers, args.stream, args.verbose, args.cache,
+        args.compress, args.level, args.mapped, args.binary, args.names, args.types
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
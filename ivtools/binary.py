@@ -0,0 +1,326 @@
+import re
+import struct
+
+import numpy as np
+
+from ivtools.fields import FLOAT_FIELDS, INDEX_FIELDS, LazyArray, float_words
+from ivtools.node import Node
+from ivtools.traverse import SKIP, walk
+
+HEADER = "#Inventor V2.1 binary"
+ASCII_HEADER = "#Inventor V2.1 ascii"
+# The header line is padded with spaces so the data after it starts on a word
+PADDED_HEADER = b"#Inventor V2.1 binary  \n"
+IS_GROUP = 0x2
+WORD = struct.Struct(">i")
+# Nodes written with the group flag even when they hold no children
+GROUPS = {"Separator", "Group", "TransformSeparator", "Switch", "LOD", "Selection", "Annotation", "WWWAnchor"}
+# Binary files do not say what type a field is, so only nodes whose field types are known here can be written
+# and read. Add entries for other nodes as they turn up
+FIELD_TYPES = {
+    "Separator": {
+        "renderCaching": "SFEnum", "boundingBoxCaching": "SFEnum", "renderCulling": "SFEnum",
+        "pickCulling": "SFEnum"
+    },
+    "Group": {},
+    "TransformSeparator": {},
+    "Switch": {"whichChild": "SFInt32"},
+    "LOD": {"range": "MFFloat", "center": "SFVec3f"},
+    "Selection": {"policy": "SFEnum"},
+    "Annotation": {},
+    "WWWAnchor": {"name": "SFString", "description": "SFString", "map": "SFEnum"},
+    "Transform": {
+        "translation": "SFVec3f", "rotation": "SFRotation", "scaleFactor": "SFVec3f",
+        "scaleOrientation": "SFRotation", "center": "SFVec3f"
+    },
+    "Translation": {"translation": "SFVec3f"},
+    "Rotation": {"rotation": "SFRotation"},
+    "RotationXYZ": {"axis": "SFEnum", "angle": "SFFloat"},
+    "Scale": {"scaleFactor": "SFVec3f"},
+    "MatrixTransform": {"matrix": "SFMatrix"},
+    "ResetTransform": {"whatToReset": "SFBitMask"},
+    "Material": {
+        "ambientColor": "MFColor", "diffuseColor": "MFColor", "specularColor": "MFColor",
+        "emissiveColor": "MFColor", "shininess": "MFFloat", "transparency": "MFFloat"
+    },
+    "BaseColor": {"rgb": "MFColor"},
+    "MaterialBinding": {"value": "SFEnum"},
+    "NormalBinding": {"value": "SFEnum"},
+    "TextureCoordinateBinding": {"value": "SFEnum"},
+    "Coordinate3": {"point": "MFVec3f"},
+    "Coordinate4": {"point": "MFVec4f"},
+    "Normal": {"vector": "MFVec3f"},
+    "TextureCoordinate2": {"point": "MFVec2f"},
+    "Texture2": {"filename": "SFString", "wrapS": "SFEnum", "wrapT": "SFEnum", "model": "SFEnum",
+                 "blendColor": "SFColor"},
+    "Texture2Transform": {
+        "translation": "SFVec2f", "rotation": "SFFloat", "scaleFactor": "SFVec2f", "center": "SFVec2f"
+    },
+    "ShapeHints": {
+        "vertexOrdering": "SFEnum", "shapeType": "SFEnum", "faceType": "SFEnum", "creaseAngle": "SFFloat"
+    },
+    "DrawStyle": {"style": "SFEnum", "pointSize": "SFFloat", "lineWidth": "SFFloat", "linePattern": "SFUShort"},
+    "Complexity": {"type": "SFEnum", "value": "SFFloat", "textureQuality": "SFFloat"},
+    "LightModel": {"model": "SFEnum"},
+    "Info": {"string": "SFString"},
+    "Label": {"label": "SFName"},
+    "IndexedFaceSet": {
+        "coordIndex": "MFInt32", "materialIndex": "MFInt32", "normalIndex": "MFInt32",
+        "textureCoordIndex": "MFInt32"
+    },
+    "IndexedLineSet": {
+        "coordIndex": "MFInt32", "materialIndex": "MFInt32", "normalIndex": "MFInt32",
+        "textureCoordIndex": "MFInt32"
+    },
+    "IndexedTriangleStripSet": {
+        "coordIndex": "MFInt32", "materialIndex": "MFInt32", "normalIndex": "MFInt32",
+        "textureCoordIndex": "MFInt32"
+    },
+    "FaceSet": {"startIndex": "SFInt32", "numVertices": "MFInt32"},
+    "LineSet": {"startIndex": "SFInt32", "numVertices": "MFInt32"},
+    "TriangleStripSet": {"startIndex": "SFInt32", "numVertices": "MFInt32"},
+    "PointSet": {"startIndex": "SFInt32", "numPoints": "SFInt32"},
+    "Cube": {"width": "SFFloat", "height": "SFFloat", "depth": "SFFloat"},
+    "Sphere": {"radius": "SFFloat"},
+    "Cone": {"parts": "SFBitMask", "bottomRadius": "SFFloat", "height": "SFFloat"},
+    "Cylinder": {"parts": "SFBitMask", "radius": "SFFloat", "height": "SFFloat"},
+    "PerspectiveCamera": {
+        "viewportMapping": "SFEnum", "position": "SFVec3f", "orientation": "SFRotation",
+        "aspectRatio": "SFFloat", "nearDistance": "SFFloat", "farDistance": "SFFloat",
+        "focalDistance": "SFFloat", "heightAngle": "SFFloat"
+    },
+    "OrthographicCamera": {
+        "viewportMapping": "SFEnum", "position": "SFVec3f", "orientation": "SFRotation",
+        "aspectRatio": "SFFloat", "nearDistance": "SFFloat", "farDistance": "SFFloat",
+        "focalDistance": "SFFloat", "height": "SFFloat"
+    },
+    "DirectionalLight": {"on": "SFBool", "intensity": "SFFloat", "color": "SFColor", "direction": "SFVec3f"},
+    "PointLight": {"on": "SFBool", "intensity": "SFFloat", "color": "SFColor", "location": "SFVec3f"},
+    "SpotLight": {
+        "on": "SFBool", "intensity": "SFFloat", "color": "SFColor", "location": "SFVec3f",
+        "direction": "SFVec3f", "dropOffRate": "SFFloat", "cutOffAngle": "SFFloat"
+    },
+    "Font": {"name": "SFName", "size": "SFFloat"},
+    "AsciiText": {"string": "MFString", "spacing": "SFFloat", "justification": "SFEnum", "width": "MFFloat"},
+    "Text2": {"string": "MFString", "spacing": "SFFloat", "justification": "SFEnum"},
+    "Text3": {"string": "MFString", "spacing": "SFFloat", "justification": "SFEnum", "parts": "SFBitMask"}
+}
+# Numbers in each value of the float types
+FLOAT_WIDTHS = {"Float": 1, "Vec2f": 2, "Vec3f": 3, "Vec4f": 4, "Color": 3, "Rotation": 4, "Matrix": 16}
+INT_TYPES = {"Int32", "Long", "UInt32", "ULong", "Short", "UShort", "Bool"}
+QUOTED = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+
+def is_binary_header(header):
+    return header is not None and header.startswith(HEADER)
+
+
+class BinaryWriter(object):
+
+    # Writes Inventor scenes in the V2.1 binary format: big-endian words, strings as a length and their bytes
+    # padded to a word, and numeric fields as packed arrays. Comments have no place in it and are dropped
+
+    def __init__(self, file):
+        self.file = file
+        # The last node written under each DEF name, as IVWriter keeps
+        self.defined = {}
+
+    def write(self, data):
+        check(data)
+        self.file.write(PADDED_HEADER)
+        self.write_data(data)
+
+    def write_data(self, node):
+        write = self.file.write
+        defined = self.defined
+
+        def enter(child, parent, depth):
+            if child.def_name is not None:
+                if defined.get(child.def_name) is child:
+                    write(string("USE") + string(child.def_name))
+                    return SKIP
+                defined[child.def_name] = child
+                write(string("DEF") + string(child.def_name))
+            nodes = child.nodes()
+            write(string(child.type) + WORD.pack(IS_GROUP if nodes or child.type in GROUPS else 0))
+            write(WORD.pack(len(child.fields)))
+            types = FIELD_TYPES[child.type]
+            for name in child.children:
+                if name.__class__ is str:
+                    write(string(name))
+                    write(field_bytes(types[name], child.fields[name]))
+                    # Field flags: not ignored, connected or default
+                    write(WORD.pack(0))
+            if nodes or child.type in GROUPS:
+                write(WORD.pack(len(nodes)))
+
+        walk(node, enter)
+
+
+class BinaryReader(object):
+
+    # Reads V2.1 binary files into the same tree IVParser builds from the ASCII form, so the scene can be
+    # edited and written either way. USE references share the node they refer to
+
+    def read(self, file):
+        raw = file.read()
+        if not raw.startswith(HEADER.encode()):
+            raise ValueError("Not a binary Inventor file")
+        header_end = raw.index(b"\n") + 1
+        header = raw[:header_end].decode("utf8").strip()
+        return header, self.parse(raw, header_end)
+
+    def parse(self, raw, position=0):
+        root = Node()
+        defs = {}
+        # The open groups and the children each has left to read; the root reads to the end. The tree is built as
+        # it is read, so there is nothing to walk yet
+        stack = [[root, -1]]
+        size = len(raw)
+        while stack:
+            entry = stack[-1]
+            if not entry[1] or entry[1] < 0 and position >= size:
+                stack.pop()
+                if entry[0].def_name is not None:
+                    defs[entry[0].def_name] = entry[0]
+                continue
+            entry[1] -= 1
+            node_type, position = read_string(raw, position)
+            if node_type == "USE":
+                def_name, position = read_string(raw, position)
+                if def_name not in defs:
+                    raise ValueError("USE of undefined node %s" % def_name)
+                entry[0].children.append(defs[def_name])
+                continue
+            def_name = None
+            if node_type == "DEF":
+                def_name, position = read_string(raw, position)
+                node_type, position = read_string(raw, position)
+            if node_type not in FIELD_TYPES:
+                raise ValueError("Unknown node %s in binary file" % node_type)
+            node = Node.create(None, def_name, node_type)
+            entry[0].children.append(node)
+            flags, fields = struct.unpack_from(">ii", raw, position)
+            position += 8
+            types = FIELD_TYPES[node_type]
+            for _ in range(fields):
+                name, position = read_string(raw, position)
+                if name not in types:
+                    raise ValueError("Unknown field %s of %s in binary file" % (name, node_type))
+                value, position = read_field(types[name], name, raw, position)
+                node.set_field(name, value)
+                # Field flags
+                position += 4
+            if flags & IS_GROUP:
+                stack.append([node, WORD.unpack_from(raw, position)[0]])
+                position += 4
+            elif def_name is not None:
+                defs[def_name] = node
+        return root
+
+
+def check(data):
+    # Raises ValueError naming the nodes and fields the binary format cannot hold, before anything is written
+
+    unknown = set(data.fields)
+
+    def enter(node, parent, depth):
+        if node.field is not None or node.type not in FIELD_TYPES:
+            unknown.add(node.type if node.field is None else "%s %s" % (node.field, node.type))
+            return SKIP
+        types = FIELD_TYPES[node.type]
+        unknown.update("%s.%s" % (node.type, name) for name in node.fields if name not in types)
+
+    walk(data, enter)
+    if unknown:
+        raise ValueError("Binary Inventor cannot hold %s" % ", ".join(sorted(unknown)))
+
+
+def string(text):
+    data = text.encode("utf8")
+    return WORD.pack(len(data)) + data + b"\0" * (-len(data) % 4)
+
+
+def read_string(raw, position):
+    size = WORD.unpack_from(raw, position)[0]
+    position += 4
+    return raw[position:position + size].decode("utf8"), position + size + (-size % 4)
+
+
+def field_bytes(field_type, value):
+    # The binary form of a field value as read from either format
+    multiple, base = field_type[:2] == "MF", field_type[2:]
+    if base in FLOAT_WIDTHS or base in INT_TYPES:
+        data = numbers(value, base)
+        if base in FLOAT_WIDTHS:
+            data = data.astype(">f4")
+            count = len(data) // FLOAT_WIDTHS[base]
+        else:
+            data = data.astype(">i4")
+            count = len(data)
+        return (WORD.pack(count) if multiple else b"") + data.tobytes()
+    if base == "String":
+        texts = unquote(value)
+        if multiple:
+            return WORD.pack(len(texts)) + b"".join(string(text) for text in texts)
+        return string(texts[0] if texts else "")
+    # Enums, bit masks and names are written as their names
+    return string(" ".join(value) if isinstance(value, list) else value)
+
+
+def numbers(value, base):
+    if value.__class__ is LazyArray:
+        value = value.resolve()
+    if isinstance(value, np.ndarray):
+        return value.ravel()
+    text = " ".join(value) if isinstance(value, list) else value
+    words = text.replace(",", " ").split()
+    if base == "Bool":
+        return np.array([word == "TRUE" for word in words], np.int32)
+    return np.array(words, np.float64 if base in FLOAT_WIDTHS else np.int64)
+
+
+def unquote(value):
+    text = "\n".join(value) if isinstance(value, list) else value
+    texts = [re.sub(r"\\(.)", r"\1", match) for match in QUOTED.findall(text)]
+    return texts if texts or not text.strip() else [text.strip()]
+
+
+def read_field(field_type, name, raw, position):
+    # Returns the value as IVParser would have read it from the ASCII form, and the next position
+    multiple, base = field_type[:2] == "MF", field_type[2:]
+    count = 1
+    if multiple:
+        count = WORD.unpack_from(raw, position)[0]
+        position += 4
+    if base in FLOAT_WIDTHS or base in INT_TYPES:
+        width = FLOAT_WIDTHS.get(base, 1)
+        dtype = ">f4" if base in FLOAT_WIDTHS else ">i4"
+        values = np.frombuffer(raw, dtype, count * width, position)
+        position += 4 * count * width
+        if multiple and name in FLOAT_FIELDS and base in FLOAT_WIDTHS:
+            return values.astype(np.float32).reshape(-1, width), position
+        if multiple and name in INDEX_FIELDS and base not in FLOAT_WIDTHS:
+            return values.astype(np.int32), position
+        return number_text(values, base, width, multiple), position
+    texts = []
+    for _ in range(count):
+        text, position = read_string(raw, position)
+        texts.append(text)
+    if base != "String":
+        return texts[0], position
+    texts = ['"%s"' % text.replace("\\", "\\\\").replace('"', '\\"') for text in texts]
+    return texts[0] if len(texts) == 1 else [", ".join(texts)], position
+
+
+def number_text(values, base, width, multiple):
+    if base == "Bool":
+        words = ["TRUE" if value else "FALSE" for value in values.tolist()]
+    elif base in FLOAT_WIDTHS:
+        words = float_words(values.astype(np.float32))
+    else:
+        words = ["%i" % value for value in values.tolist()]
+    if not multiple or len(words) == width:
+        return " ".join(words)
+    # Lists are kept on one line, as IVParser reads short ones
+    return [", ".join(" ".join(words[i:i + width]) for i in range(0, len(words), width))]
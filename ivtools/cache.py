@@ -0,0 +1,129 @@
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+
+from ivtools.files import open_input
+from ivtools.parser import VERSION, IVParser
+
+MAGIC = b"IVTC"
+HEADER = struct.Struct("<4sQQ")
+SIZE = struct.Struct("<Q")
+ALIGNMENT = 64
+SUFFIX = ".ivcache"
+CHUNK_SIZE = 1 << 20
+
+
+class ParseCache(object):
+
+    # Parsed scenes are pickled with protocol 5; NumPy array buffers are stored out-of-band after the pickle
+
+    def __init__(self, directory, max_size=1 << 30):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def read(self, file_path, parser=None):
+        parser = IVParser() if parser is None else parser
+        path = os.path.join(self.directory, self.key(file_path, parser) + SUFFIX)
+        try:
+            result = self.__load(path)
+            os.utime(path)
+            self.hits += 1
+            return result
+        except (OSError, EOFError, ValueError, struct.error, pickle.UnpicklingError):
+            self.misses += 1
+        with open_input(file_path) as file:
+            result = parser.read(file)
+        self.__save(path, result)
+        self.__evict()
+        return result
+
+    def stats(self):
+        entries = self.__entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size": sum(size for _, size, _ in entries)
+        }
+
+    def clear(self):
+        for path, _, _ in self.__entries():
+            os.remove(path)
+
+    @staticmethod
+    def key(file_path, parser):
+        digest = hashlib.blake2b(("%s:%s:" % (VERSION, parser.numeric)).encode())
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def __load(path):
+        with open(path, "rb") as file:
+            content = bytearray(file.read())
+        magic, payload_size, count = HEADER.unpack_from(content)
+        if magic != MAGIC:
+            raise ValueError("Not a parse cache file: %s" % path)
+        offset = HEADER.size
+        sizes = [SIZE.unpack_from(content, offset + i * SIZE.size)[0] for i in range(count)]
+        offset += count * SIZE.size
+        payload = memoryview(content)[offset:offset + payload_size]
+        offset += payload_size
+        buffers = []
+        for size in sizes:
+            offset += -offset % ALIGNMENT
+            buffers.append(memoryview(content)[offset:offset + size])
+            offset += size
+        return pickle.loads(payload, buffers=buffers)
+
+    def __save(self, path, result):
+        buffers = []
+        payload = pickle.dumps(result, protocol=5, buffer_callback=buffers.append)
+        buffers = [buffer.raw() for buffer in buffers]
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        handle, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, "wb") as file:
+            file.write(HEADER.pack(MAGIC, len(payload), len(buffers)))
+            for buffer in buffers:
+                file.write(SIZE.pack(buffer.nbytes))
+            file.write(payload)
+            offset = HEADER.size + len(buffers) * SIZE.size + len(payload)
+            for buffer in buffers:
+                file.write(b"\0" * (-offset % ALIGNMENT))
+                offset += -offset % ALIGNMENT
+                file.write(buffer)
+                offset += buffer.nbytes
+        os.replace(temp_path, path)
+
+    def __evict(self):
+        # Least recently used entries go first; hits refresh an entry's modification time
+        entries = sorted(self.__entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def __entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
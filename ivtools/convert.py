@@ -0,0 +1,388 @@
+from ivtools.node import Node
+from ivtools.traverse import SKIP, walk
+
+
+class IVConverter(object):
+
+    # VRML 2.0 to Inventor
+
+    def __init__(self):
+        self.ext = "iv"
+        self.nodes = 0
+        # Rules by node key, compiled as new keys turn up
+        self.rules = {}
+
+    def convert_data(self, data, converted=None):
+        # The source tree is only read, so it can be cached or converted again
+        new_data = Node()
+        rules = self.rules
+        # DEF nodes converted so far, keyed with the grandchild moved out of them, so nodes shared through USE
+        # are converted once and shared in the result too. Streams pass stand-ins for earlier top-level nodes
+        if converted is None:
+            converted = {}
+        # For each node being visited: its converted node, its restructured entries, the Material and Coordinate3
+        # children that go first and whether the node closes there, which node lists do not. This is not walk,
+        # which follows children lists: the entries moved grandchildren, merged materials and flattened lists
+        # are only known as each node is reached
+        stack = [(new_data, iter(self.__plain_entries(data)), None, False)]
+        while stack:
+            new_parent, entries, ordered, close = stack[-1]
+            for child, value in entries:
+                if child.__class__ is str:
+                    new_parent.set_field(child, value)
+                    continue
+                if child.type == "[":
+                    # Inventor groups hold the nodes of VRML children [ ... ] lists directly
+                    stack.append((new_parent, iter(self.__plain_entries(child)), ordered, False))
+                    break
+                self.nodes += 1
+                key = (child.field, child.type)
+                rule = rules.get(key) or self.__rule(key)
+                if rule.drop:
+                    continue
+                if child.def_name is not None and (child, value) in converted:
+                    new_node = converted[child, value]
+                    new_parent.children.append(new_node)
+                    if ordered is not None and rule.order is not None:
+                        ordered[rule.order] = new_node
+                    continue
+                if rule.template is not None:
+                    # Shapes are named by their comment, which exporters put the part name in, or their DEF name
+                    name = child.comment if child.def_name is None else child.def_name
+                    new_node = Node(rule.template % name, child.comment)
+                elif rule.parts is not None:
+                    new_node = Node.create(rule.parts[0], child.def_name, rule.parts[1], child.comment)
+                else:
+                    new_node = Node.create(child.field, child.def_name, child.type, child.comment)
+                new_parent.children.append(new_node)
+                if ordered is not None and rule.order is not None:
+                    # The last Material and Coordinate3 go first
+                    ordered[rule.order] = new_node
+                if child.def_name is not None:
+                    converted[child, value] = new_node
+                # value is the grandchild moved out of child, if any
+                stack.append((new_node, iter(self.__entries(child, rule, value)), [None, None], True))
+                break
+            else:
+                stack.pop()
+                if close and (ordered[0] is not None or ordered[1] is not None):
+                    children = [child for child in ordered if child is not None]
+                    children += [child for child in new_parent.children if child not in ordered]
+                    new_parent.children = children
+        return new_data
+
+    def convert_node(self, node, converted=None):
+        root = Node()
+        root.add_node(node)
+        new_nodes = self.convert_data(root, converted).nodes()
+        return new_nodes[0] if new_nodes else None
+
+    def __rule(self, key):
+        rule = self.rules[key] = Rule(key)
+        return rule
+
+    @staticmethod
+    def __plain_entries(node):
+        return [(child, node.fields[child]) if child.__class__ is str else (child, None) for child in node.children]
+
+    def __entries(self, node, rule, moved):
+        # The children of node as the conversion sees them, in one pass: (name, value) for fields and
+        # (node, moved) for nodes, where moved is a grandchild taken out of that node
+        entries = []
+        material = None
+        # Coordinate3 moves up a level from the first geometry that has one
+        coord = None
+        for child in node.children:
+            if child.__class__ is str:
+                # Filter some fields
+                if not (rule.geometry and child in GEOMETRY_FILTERED):
+                    entries.append((child, node.fields[child]))
+            elif child is moved:
+                continue
+            elif rule.appearance and material is None and self.__child_rule(child).material:
+                material = child
+            else:
+                sub_child = None if coord is not None else self.__coord(child)
+                entries.append((child, sub_child))
+                coord = coord or sub_child
+
+        # The fields and nodes of the first material are merged into appearance, which becomes the Material
+        if material is not None:
+            for child in material.children:
+                if child.__class__ is str:
+                    if child != "ambientIntensity":
+                        entries.append((child, material.fields[child]))
+                else:
+                    sub_child = None if coord is not None else self.__coord(child)
+                    entries.append((child, sub_child))
+                    coord = coord or sub_child
+
+        if coord is not None:
+            entries.append((coord, None))
+        return entries
+
+    def __coord(self, node):
+        if self.__child_rule(node).geometry:
+            for child in node.children:
+                if child.__class__ is not str and self.__child_rule(child).coord:
+                    return child
+        return None
+
+    def __child_rule(self, node):
+        key = (node.field, node.type)
+        return self.rules.get(key) or self.__rule(key)
+
+    def convert_header(self):
+        return "#Inventor V2.1 ascii"
+
+
+class VRMLConverter(object):
+
+    # Inventor to VRML 2.0. Inventor property nodes set state for the shapes after them in the same
+    # separator, so properties are carried in a scope per group and copied into each Shape
+
+    def __init__(self):
+        self.ext = "wrl"
+        self.nodes = 0
+
+    def convert_data(self, data, converted=None):
+        new_data = Node()
+        # Inventor faces are two-sided unless shape hints say otherwise
+        scopes = [Scope(None, new_data, hints={"solid": "FALSE"})]
+        # Nodes converted in earlier calls, keyed as IVConverter keys them, which are added as they are rather
+        # than converted again. Streams pass stand-ins for the DEF nodes of earlier top-level nodes here
+        if converted is None:
+            converted = {}
+
+        def enter(node, parent, depth):
+            self.nodes += 1
+            scope = scopes[-1]
+            if node.def_name is not None and (node, None) in converted:
+                scope.target.add_node(converted[node, None])
+                return SKIP
+            if scope.opaque:
+                new_node = Node(node.name, node.comment)
+                scope.target.add_node(new_node)
+                scopes.append(Scope(new_node, new_node, opaque=True))
+            elif node.type in GROUPS or node.type in TRANSFORMS and len(node.fields) < len(node.children):
+                # Transforms holding nodes come from VRML and group like it
+                transform = Node(self.__group_name(node), node.comment, self.__fields(node, TRANSFORM_FIELDS, single))
+                scopes.append(Scope(transform, Node("children ["), scope.properties, scope.hints))
+            elif node.type in PROPERTIES:
+                name, field_names = PROPERTIES[node.type]
+                # Inventor materials may list several values, VRML takes one
+                scope.properties[name] = self.__fields(node, field_names, single if node.type == "Material" else None)
+                return SKIP
+            elif node.type == "ShapeHints":
+                scope.hints = dict(scope.hints)
+                for field_name, value in node.fields.items():
+                    if (field_name, single(value)) in HINTS:
+                        hint, hint_value = HINTS[field_name, single(value)]
+                        scope.hints[hint] = hint_value
+                    elif field_name == "creaseAngle":
+                        scope.hints[field_name] = single(value)
+                return SKIP
+            elif node.type in TRANSFORMS:
+                # The transform applies to the rest of the group, which goes into its children
+                transform = Node("Transform", fields=self.__fields(node, TRANSFORM_FIELDS, single))
+                children = Node("children [")
+                transform.add_node(children)
+                scope.target.add_node(transform)
+                scope.target = children
+                return SKIP
+            elif node.type in GEOMETRY:
+                geometry = Node("geometry " + node.type)
+                for name in GEOMETRY_PROPERTIES:
+                    if name in scope.properties:
+                        geometry.add_node(Node(name, fields=scope.properties[name]))
+                for field_name, value in self.__fields(node, GEOMETRY_FIELDS).items():
+                    geometry.set_field(field_name, value)
+                if node.type == "IndexedFaceSet":
+                    for field_name, value in scope.hints.items():
+                        geometry.set_field(field_name, value)
+                scope.target.add_node(self.__shape(geometry, scope))
+                return SKIP
+            elif node.type in PRIMITIVES:
+                geometry = Node("geometry " + PRIMITIVES[node.type])
+                if node.type == "Cube":
+                    size = [single(node.fields.get(name, "2")) for name in ("width", "height", "depth")]
+                    geometry.set_field("size", " ".join(size))
+                else:
+                    for field_name, value in node.fields.items():
+                        geometry.set_field(field_name, single(value))
+                scope.target.add_node(self.__shape(geometry, scope))
+                return SKIP
+            else:
+                # Nodes without a VRML counterpart are copied as they are
+                new_node = Node(node.name, node.comment)
+                scope.target.add_node(new_node)
+                scopes.append(Scope(new_node, new_node, opaque=True))
+
+        def leave(node, parent, depth):
+            scope = scopes.pop()
+            if scope.opaque:
+                return
+            transform = scope.node
+            children = scope.children
+            shape = children.children[0] if len(children.children) == 1 else None
+            if shape is not None and shape.type == "Shape" and shape.def_name is None and not transform.fields:
+                # A separator around a single shape becomes that shape, keeping its DEF name, the reverse of
+                # IVConverter. Shapes used from an earlier stream node keep their own name
+                shape.def_name = node.def_name
+                shape.comment = node.comment
+                new_node = shape
+            else:
+                if children.children:
+                    transform.add_node(children)
+                new_node = transform
+            scopes[-1].target.add_node(new_node)
+
+        def field(node, name, depth):
+            # Fields of groups are Inventor specific, the rest are kept
+            scope = scopes[-1]
+            if scope.opaque or scope.node is None:
+                scope.target.set_field(name, node.fields[name])
+
+        walk(data, enter, leave, field)
+        return new_data
+
+    def convert_node(self, node, converted=None):
+        # Converts node on its own, without properties set before it
+        root = Node()
+        root.add_node(node)
+        new_nodes = self.convert_data(root, converted).nodes()
+        return new_nodes[0] if new_nodes else None
+
+    def convert_header(self):
+        return "#VRML V2.0 utf8"
+
+    @staticmethod
+    def __group_name(node):
+        return "Transform" if node.def_name is None else "DEF %s Transform" % node.def_name
+
+    @staticmethod
+    def __fields(node, names, convert=None):
+        # The fields of node that VRML has, under their VRML names
+        fields = {names[name]: value for name, value in node.fields.items() if name in names}
+        if convert is not None:
+            fields = {name: convert(value) for name, value in fields.items()}
+        return fields
+
+    @staticmethod
+    def __shape(geometry, scope):
+        shape = Node("Shape")
+        if "material Material" in scope.properties:
+            appearance = Node("appearance Appearance")
+            appearance.add_node(Node("material Material", fields=scope.properties["material Material"]))
+            shape.add_node(appearance)
+        shape.add_node(geometry)
+        return shape
+
+
+class Scope(object):
+
+    # Conversion state of an open group: where converted nodes go and the properties in effect
+
+    __slots__ = ("node", "children", "target", "properties", "hints", "opaque")
+
+    def __init__(self, node, children, properties=None, hints=None, opaque=False):
+        self.node = node
+        self.children = children
+        self.target = children
+        self.properties = {} if properties is None else dict(properties)
+        self.hints = {} if hints is None else hints
+        self.opaque = opaque
+
+
+class Rule(object):
+
+    # What the Inventor conversion does with the nodes of one name, matched once against the prefixes below.
+    # Nodes are keyed by field and type, which is all the prefixes can see. DEF names are kept, so shared nodes
+    # convert like the others
+
+    __slots__ = ("drop", "appearance", "material", "geometry", "coord", "template", "parts", "order")
+
+    def __init__(self, key):
+        field, node_type = key
+        name = " ".join(word for word in (field, node_type) if word)
+        self.drop = name.startswith(DROPPED_PREFIXES)
+        self.appearance = name.startswith("appearance")
+        self.material = name.startswith("material")
+        self.geometry = name.startswith("geometry")
+        self.coord = name.startswith("coord")
+        renamed = "Material" if self.appearance else None
+        for prefix, new_name in RENAMED_PREFIXES:
+            if (renamed or name).startswith(prefix):
+                renamed = new_name
+                break
+        new_name = renamed or name
+        self.template = renamed if renamed is not None and "%s" in renamed else None
+        self.parts = None
+        if renamed is not None and self.template is None:
+            node = Node(renamed)
+            self.parts = node.field, node.type
+        self.order = None
+        for i, prefix in enumerate(ORDERED_PREFIXES):
+            if self.template is None and new_name.startswith(prefix):
+                self.order = i
+
+
+def single(value):
+    # The first value of a bracketed field, for VRML fields that hold one value
+    if isinstance(value, list):
+        # One-line lists hold all their values in one row
+        return value[0].split(",")[0].strip() if value else ""
+    return value
+
+
+# Inventor conversion rules by name prefix: nodes to drop, renames, and the nodes that go first, in order
+DROPPED_PREFIXES = ("Background", "texCoord", "normal")
+RENAMED_PREFIXES = [("Shape", "DEF %s Separator"), ("coord", "Coordinate3"), ("geometry IndexedFaceSet", "IndexedFaceSet")]
+ORDERED_PREFIXES = ["Material", "Coordinate3"]
+GEOMETRY_FILTERED = {"ccw", "convex", "solid"}
+GROUPS = {"Separator", "Group", "TransformSeparator", "Switch"}
+GEOMETRY = {"IndexedFaceSet", "IndexedLineSet", "PointSet"}
+PRIMITIVES = {"Cube": "Box", "Sphere": "Sphere", "Cone": "Cone", "Cylinder": "Cylinder"}
+TRANSFORMS = {"Transform", "Translation", "Rotation", "Scale"}
+TRANSFORM_FIELDS = {
+    "translation": "translation", "rotation": "rotation", "scaleFactor": "scale", "scale": "scale",
+    "scaleOrientation": "scaleOrientation", "center": "center"
+}
+GEOMETRY_FIELDS = {
+    "coordIndex": "coordIndex", "normalIndex": "normalIndex", "textureCoordIndex": "texCoordIndex",
+    "texCoordIndex": "texCoordIndex"
+}
+# Inventor property nodes, the VRML nodes they become and the fields they keep
+PROPERTIES = {
+    "Material": ("material Material", {
+        "diffuseColor": "diffuseColor", "specularColor": "specularColor", "emissiveColor": "emissiveColor",
+        "shininess": "shininess", "transparency": "transparency"
+    }),
+    "Coordinate3": ("coord Coordinate", {"point": "point"}),
+    "Normal": ("normal Normal", {"vector": "vector"}),
+    "TextureCoordinate2": ("texCoord TextureCoordinate", {"point": "point"})
+}
+GEOMETRY_PROPERTIES = ["coord Coordinate", "normal Normal", "texCoord TextureCoordinate"]
+HINTS = {
+    ("vertexOrdering", "COUNTERCLOCKWISE"): ("ccw", "TRUE"),
+    ("vertexOrdering", "CLOCKWISE"): ("ccw", "FALSE"),
+    ("shapeType", "SOLID"): ("solid", "TRUE"),
+    ("shapeType", "UNKNOWN_SHAPE_TYPE"): ("solid", "FALSE")
+}
+
+# Conversion backends by output extension
+CONVERTERS = {}
+
+
+def register(ext, converter):
+    CONVERTERS[ext] = converter
+
+
+def get_converter(ext):
+    if ext not in CONVERTERS:
+        raise NotImplementedError("Sorry, conversion to %s is not supported in this version" % ext)
+    return CONVERTERS[ext]()
+
+
+register("iv", IVConverter)
+register("wrl", VRMLConverter)
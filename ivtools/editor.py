@@ -1,255 +1,202 @@
+import io
+import json
+import logging
+import os
+
+import yaml
+
+from ivtools.binary import ASCII_HEADER, BinaryReader, BinaryWriter, check, is_binary_header
+from ivtools.convert import get_converter
+from ivtools.files import COMPRESS_LEVEL, input_size, is_binary, is_compressed, open_input, replace_output
+from ivtools.index import NodeIndex
+from ivtools.instance import Instancer
+from ivtools.mapped import MappedParser
+from ivtools.metrics import DEBUG, INFO, Metrics
 from ivtools.namespace import Namespace
+from ivtools.parallel import ParallelParser
+from ivtools.partial import PartialReader
+from ivtools.parser import IVParser
+from ivtools.weld import TOLERANCE, Welder
+from ivtools.writer import BUFFER_SIZE, IVWriter
 
 
 class IVEditor(object):
 
-    def __init__(self):
+    def __init__(self, cache=None, metrics=None, mapped=False, workers=1):
+        # Mapped reads leave large arrays unparsed in the mapped file until they are used.
+        # With more than one worker, top-level nodes are parsed in that many processes
+        self.cache = cache
+        self.mapped = mapped
+        self.workers = workers
+        self.source = None
+        # The partial read the scene came from, which writes splice the changed nodes back into
+        self.partial = None
+        self.metrics = Metrics() if metrics is None else metrics
         self.data = None
+        self.index = None
         self.new_nodes = None
         self.template_nodes = None
 
-    def read(self, file_path):
+    def read(self, file_path, names=None, types=None):
+        # With DEF names or node types, only those nodes are read, and writes copy the rest of the file as it is.
+        # The editor keeps its scene and the file it came from until the new one has been read
+        source = None
+        partial = None
+        with self.metrics.phase("read"):
+            if names or types:
+                if is_binary(file_path):
+                    raise ValueError("Binary Inventor files cannot be read in part: %s" % file_path)
+                partial = PartialReader(names, types)
+                header, data = partial.read(file_path)
+                source = file_path
+            elif is_binary(file_path):
+                with open_input(file_path, binary=True) as file:
+                    header, data = BinaryReader().read(file)
+            elif self.cache is not None:
+                header, data = self.cache.read(file_path)
+            elif self.mapped and not is_compressed(file_path):
+                header, data = MappedParser().read(file_path)
+                source = file_path
+            else:
+                with open_input(file_path) as file:
+                    if self.metrics.on_progress is not None:
+                        file = self.metrics.track("read", file, input_size(file_path))
+                    if self.workers > 1:
+                        header, data = ParallelParser(self.workers).read(file)
+                    else:
+                        header, data = IVParser().read(file)
+            index = NodeIndex(data)
         self.data = Namespace(
             {
-                "HEADER": self.__read_header(file_path),
-                "DATA": self.__read_data(file_path)
+                "HEADER": header,
+                "DATA": data
             }
         )
-
-    def write(self, file_path):
-        self.__write_header(file_path)
-        self.__write_data(file_path)
+        self.index = index
+        self.source = source
+        self.partial = partial
+        self.metrics.count("bytes_read", os.path.getsize(file_path))
+        self.metrics.count("nodes_visited", len(self.index))
+        self.metrics.emit(INFO, "Read %i nodes from %s", len(self.index), file_path)
+
+    def write(self, file, compress=None, level=COMPRESS_LEVEL, binary=None):
+        # Paths are gzip-compressed when compress is set, or by extension when it is None. Scenes read from
+        # binary files are written back in binary unless binary is False
+        if binary is None:
+            binary = is_binary_header(self.data.HEADER) and self.partial is None
+        spliced = self.partial is not None and self.partial.data is self.data.DATA
+        # Checked before anything is opened, so a scene that cannot be written leaves the target as it was
+        if spliced and binary:
+            raise ValueError("Partial reads are written back into the file they came from, which is not binary")
+        if binary:
+            check(self.data.DATA)
+        progress = None
+        if self.metrics.on_progress is not None:
+            total = len(self.index)
+            progress = lambda done: self.metrics.progress("write", done, total)
+        with self.metrics.phase("write"):
+            if isinstance(file, str):
+                # Always through a new file, as truncating a mapped or partly read source would pull it from
+                # under the arrays and nodes not yet copied from it
+                with replace_output(file, compress, level, binary) as stream:
+                    self.__write_data(stream, binary, spliced, progress)
+            else:
+                self.__write_data(file, binary, spliced, progress)
+        if isinstance(file, str):
+            self.metrics.count("bytes_written", os.path.getsize(file))
+            self.metrics.emit(INFO, "Wrote %s", file)
+
+    def __write_data(self, file, binary, spliced, progress):
+        if spliced:
+            if isinstance(file, io.TextIOBase):
+                file.flush()
+                file = file.buffer
+            self.partial.write(file)
+        elif binary:
+            BinaryWriter(file).write(self.data.DATA)
+        else:
+            header = ASCII_HEADER if is_binary_header(self.data.HEADER) else self.data.HEADER
+            IVWriter(file, progress=progress).write(header, self.data.DATA)
 
     def load_template_file(self, file_path):
         self.template_nodes = Namespace(file_path)
 
-    def write_nodes_file(self, file_path):
-        nodes = self.data.DATA.get_nodes()
-        written = []
-        with open(file_path, "w") as file:
-            for node in nodes:
-                if node not in written:
-                    written.append(node)
-                    file.write("%s:\n" % node)
-                    for key, fields in self.template_nodes.get().items():
-                        file.write("%s%s:\n" % (" " * 2, key))
-                        for field, value in fields.get().items():
-                            file.write("%s%s: %s\n" % (" " * 4, field, "" if value is None else value))
+    def write_nodes_file(self, file_path, style="block"):
+        # Each DEF name once, in document order
+        nodes = dict.fromkeys(self.data.DATA.iter_nodes())
+        template = {key: fields.get() for key, fields in self.template_nodes.get().items()}
+        with open(file_path, "w", buffering=BUFFER_SIZE) as file:
+            if style == "block":
+                block = "".join(
+                    "%s%s:\n%s" % (" " * 2, key, "".join(
+                        "%s%s: %s\n" % (" " * 4, field, "" if value is None else value) for field, value in fields.items()
+                    )) for key, fields in template.items()
+                )
+                file.writelines("%s:\n%s" % (node, block) for node in nodes)
+            elif style == "flow":
+                flow = yaml.safe_dump(template, default_flow_style=True, width=float("inf"), sort_keys=False).strip()
+                file.writelines("%s: %s\n" % (node, flow) for node in nodes)
+            elif style == "json":
+                body = json.dumps(template, separators=(",", ":"))
+                file.write("{%s}\n" % ",".join("%s:%s" % (json.dumps(node), body) for node in nodes))
+            else:
+                raise ValueError("Unknown nodes file style: %s" % style)
 
     def load_nodes_file(self, file_path):
         self.new_nodes = Namespace(file_path)
-        print(self.new_nodes)
+        self.metrics.emit(DEBUG, "%s", self.new_nodes)
 
     def apply_nodes(self):
-        self.data.DATA.apply_nodes(self.new_nodes)
+        with self.metrics.phase("apply"):
+            report = self.index.apply_nodes(self.new_nodes)
+        self.metrics.count("nodes_visited", report.nodes)
+        self.metrics.count("nodes_added", report.nodes_added)
+        self.metrics.count("fields_added", report.fields_added)
+        self.metrics.count("fields_changed", report.fields_changed)
+        self.metrics.emit(INFO, "%s", report)
+        return report
 
     def convert(self, ext):
-        new_data = Namespace(
-            {
-                "HEADER": self.__convert_header(ext),
-                "DATA": self.__convert_data(ext)
-            }
-        )
-        self.data = new_data
-
-    def delete(self, node_name):
-        self.data.DATA.delete(node_name, recursive=True)
-
-    def __write_header(self, file_path):
-        with open(file_path, "w") as file:
-            file.writelines("%s\n\n" % self.data.HEADER)
-
-    def __write_data(self, file_path):
-        self.data.DATA.write(file_path)
-
-    def __read_data(self, file_path):
-        text = ""
-        sub_space = []
-        data = Namespace()
-        field_open = False
-        with open(file_path, "r", encoding="utf8", errors='ignore') as file:
-            for line in file.readlines():
-                if line.strip():
-                    if sub_space and not field_open and not self.__bracket(line):
-                        # One-line field
-                        data.add(
-                            {
-                                line.strip().split()[0]: " ".join(line.strip().split()[1:])
-                            },
-                            sub_space=sub_space
-                        )
-                    else:
-                        for char in line.split("#")[0] + "\n" if "#" in line else line:
-                            if char == "{":
-                                data, sub_space = self.__add_node(data, text, line, sub_space)
-                                text = ""
-                            elif char == "}":
-                                sub_space = sub_space[:-2]
-                                text = ""
-                            elif char == "[":
-                                text += char
-                                field_open = True
-                            elif char == "]":
-                                field_open = False
-                                self.__add_field(data, text, sub_space)
-                                text = ""
-                            else:
-                                text += char
-        return data
-
-    @staticmethod
-    def __add_node(data, text, line, sub_space):
-        name = " ".join(text.strip().split("\n")[-1].strip().split())
-        comment = " ".join(line.split("#")[1:]).strip() if line.split("#")[1:] else None
-        node = "NODE_%i" % len(data.get(sub_space))
-        data.add(
-            {
-                node: {
-                    "NAME": name,
-                    "COMMENT": comment,
-                    "CHILDREN": {}
+        with self.metrics.phase("convert"):
+            converter = get_converter(ext)
+            new_data = Namespace(
+                {
+                    "HEADER": converter.convert_header(),
+                    "DATA": converter.convert_data(self.data.DATA)
                 }
-            }, sub_space=sub_space
-        )
-        return data, sub_space + [node, "CHILDREN"]
-
-    @staticmethod
-    def __add_field(data, text, sub_space):
-        name, value = text.split("[")
-        name = name.split("{")[-1].strip()
-        value = [" ".join(row.strip().split()) for row in value.split("\n") if row.strip()]
-        data.add(
-            {
-                name: value
-            },
-            sub_space=sub_space
-        )
-        return data
+            )
+            self.data = new_data
+            self.index = NodeIndex(self.data.DATA)
+        self.metrics.count("nodes_visited", converter.nodes)
+
+    def weld(self, tolerance=TOLERANCE):
+        with self.metrics.phase("weld"):
+            report = Welder(tolerance).weld_data(self.data.DATA)
+        self.metrics.count("vertices_removed", report.vertices_removed)
+        self.metrics.count("bytes_saved", report.bytes_saved)
+        self.metrics.emit(INFO, "%s", report)
+        return report
+
+    def instance(self):
+        # Best after converting, as Inventor conversion tells DEF nodes apart by name
+        with self.metrics.phase("instance"):
+            report = Instancer().instance_data(self.data.DATA)
+            self.index = NodeIndex(self.data.DATA)
+        self.metrics.count("nodes_visited", report.nodes)
+        self.metrics.count("nodes_removed", report.nodes_removed)
+        self.metrics.emit(INFO, "%s", report)
+        return report
 
-    def __convert_data(self, ext):
-        if ext == "iv":
-            new_data = Namespace()
-            for name, node in self.data.DATA.get().items():
-                new_node = self.__convert_to_iv(node)
-                if new_node is not None:
-                    new_data.add(
-                        {name: new_node}
-                    )
-            return new_data
-        else:
-            raise NotImplementedError("Sorry, only conversion to iv is supported in this version")
-
-    def __convert_to_iv(self, node):
-        # Remove some nodes
-        if node.NAME.startswith("Background") or node.NAME.startswith("texCoord") or node.NAME.startswith("normal"):
-            return None
-
-        # Restructure appearance node
-        if node.NAME.startswith("appearance"):
-            for name, child in node.CHILDREN.__dict__.items():
-                if name.startswith("NODE") and child.NAME.startswith("material"):
-                    child.CHILDREN.remove("ambientIntensity")
-                    node.CHILDREN.add(child.CHILDREN.__dict__)
-                    node.CHILDREN.remove(name)
-                    break
-            node.NAME = "Material"
-
-        # Move Coordinate3 up a level from IndexedFaceSet
-        exit_flag = False
-        for name, child in node.CHILDREN.__dict__.items():
-            if isinstance(child, Namespace) and "NAME" in child.__dict__ and child.NAME.startswith("geometry"):
-                for sub_name, sub_child in child.CHILDREN.__dict__.items():
-                    if isinstance(sub_child, Namespace) and "NAME" in sub_child.__dict__ and sub_child.NAME.startswith("coord"):
-                        node.CHILDREN.add(
-                            {"NODE_%i" % len(child.CHILDREN): sub_child}
-                        )
-                        child.CHILDREN.remove(sub_name)
-                        exit_flag = True
-                        break
-            if exit_flag is True:
-                break
-
-        # Convert this node
-        new_node = Namespace(
-            {
-                "NAME": self.__convert_name(node.NAME, node.COMMENT, "iv"),
-                "COMMENT": node.COMMENT,
-                "CHILDREN": {}
-            }
-        )
-        # Convert the child nodes
-        for name, child in node.CHILDREN.__dict__.items():
-            if name.startswith("NODE"):
-                new_child = self.__convert_to_iv(child)
-            # Filter some fields
-            elif node.NAME.startswith("geometry") and name in ["ccw", "convex", "solid"]:
-                new_child = None
-            else:
-                new_child = child
-            if new_child is not None:
-                new_node.CHILDREN.add({name: new_child})
-
-        # Swap the child node orders
-        material = None
-        coord3 = None
-        # get the manes of coordinate3 and material
-        for name, child in new_node.CHILDREN.__dict__.items():
-            if name.startswith("NODE") and child.NAME.startswith("Coordinate3"):
-                coord3 = name
-            elif name.startswith("NODE") and child.NAME.startswith("Material"):
-                material = name
-        # make a new children namespace
-        new_child = Namespace()
-        # Add the material
-        if material is not None:
-            new_child.add({material: new_node.CHILDREN.get(material)})
-        # Add the material
-        if coord3 is not None:
-            new_child.add({coord3: new_node.CHILDREN.get(coord3)})
-        # Add the rest
-        for name, child in new_node.CHILDREN.__dict__.items():
-            if name != material and name != coord3:
-                new_child.add({name: child})
-        new_node.CHILDREN = new_child
-        return new_node
-
-    @staticmethod
-    def __convert_name(name, comment, ext):
-        if ext == "iv":
-            if name.startswith("Shape"):
-                return "DEF %s Separator" % comment
-            if name.startswith("coord"):
-                return "Coordinate3"
-            if name.startswith("geometry IndexedFaceSet"):
-                return "IndexedFaceSet"
-        #elif name.startswith("material"):
-        #    return "Material"
-        #elif name.startswith("coord"):
-        #    return "Coordinate3"
-        #else:
-        #    return name
-        return name
-
-    @staticmethod
-    def __convert_fields(fields, node):
-        if node == "Material" or node.startswith("material"):
-            return [field for field in fields if not field.startswith("ambientIntensity")]
-        else:
-            return fields
-
-    @staticmethod
-    def __convert_header(ext):
-        if ext == "iv":
-            return "#Inventor V2.1 ascii"
-        elif ext == "wrl":
-            return "#VRML V2.0 utf8"
+    def delete(self, node_name):
+        with self.metrics.phase("delete"):
+            deleted = self.index.delete(node_name)
+        self.metrics.count("nodes_deleted", len(deleted))
+        if self.metrics.enabled(INFO):
+            for _, parent in deleted:
+                self.metrics.emit(INFO, "%s node deleted from %s", node_name, parent.name or None)
 
-    @staticmethod
-    def __bracket(x):
-        if any([item in x for item in ["{", "[", "(", "}", "]", ")"]]):
-            return True
-        else:
-            return False
+    def find(self, def_name=None, node_type=None):
+        return self.index.find(def_name=def_name, node_type=node_type)
 
     @staticmethod
     def __get_name(line):
@@ -258,21 +205,10 @@ class IVEditor(object):
         else:
             return line.split("{")[0].strip()
 
-    @staticmethod
-    def __read_header(file_path):
-        header = ""
-        with open(file_path, "r", encoding="utf8", errors='ignore') as file:
-            for line in file.readlines():
-                line = line.strip()
-                if "{" in line:
-                    break
-                elif line and line.startswith("#"):
-                    header += line
-        return header
-
 
 if __name__ == "__main__":
 
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     editor = IVEditor()
     while True:
         try:
@@ -0,0 +1,60 @@
+HEADER = "header"
+START = "start"
+FIELD = "field"
+END = "end"
+
+
+def tree_events(node, defined=None):
+    # Replays the children of a scene node as node and field events, without recursion. Shared nodes are
+    # replayed once and then as the USE fields they were read from. defined carries the nodes replayed so far
+    # by name across calls, for streams replayed one top-level node at a time. walk cannot yield, and replaying
+    # through a generator of walk's steps took 0.64s against 0.33s here for the 300k-node tree of bench_traverse
+    parent, children = node, iter(node.children)
+    stack = []
+    if defined is None:
+        defined = {}
+    while True:
+        for child in children:
+            if child.__class__ is str:
+                yield FIELD, child, parent.fields[child]
+            elif child.def_name is not None and defined.get(child.def_name) is child:
+                yield use_field(child)
+            else:
+                if child.def_name is not None:
+                    defined[child.def_name] = child
+                yield START, child.name, child.comment
+                stack.append((parent, children))
+                parent, children = child, iter(child.children)
+                break
+        else:
+            if not stack:
+                return
+            yield END,
+            parent, children = stack.pop()
+
+
+def use_field(node):
+    # A reference to a shared node, as the field event it is parsed from
+    if node.field is None:
+        return FIELD, "USE", node.def_name
+    return FIELD, node.field, "USE %s" % node.def_name
+
+
+def node_events(node, defined=None):
+    if defined is not None and node.def_name is not None:
+        defined[node.def_name] = node
+    yield START, node.name, node.comment
+    yield from tree_events(node, defined)
+    yield END,
+
+
+def skip_node(events):
+    # Consumes events up to the end event of the node that has just been started
+    depth = 1
+    for event in events:
+        if event[0] == START:
+            depth += 1
+        elif event[0] == END:
+            depth -= 1
+            if not depth:
+                return
@@ -0,0 +1,84 @@
+import re
+
+import numpy as np
+
+FLOAT_FIELDS = {"point", "vector", "color"}
+INDEX_FIELDS = {"coordIndex", "normalIndex", "colorIndex", "texCoordIndex", "materialIndex"}
+NUMERIC_FIELDS = FLOAT_FIELDS | INDEX_FIELDS
+FIRST_ROW = re.compile(r"[^,\s][^,\n]*")
+WHOLE = re.compile(r"\.0\b")
+
+
+def parse_array(name, text):
+    if name in INDEX_FIELDS:
+        dtype = np.int32
+    elif name in FLOAT_FIELDS:
+        dtype = np.float32
+    else:
+        return None
+    try:
+        values = np.fromstring(text.replace(",", " "), dtype, sep=" ")
+    except ValueError:
+        return None
+    if not values.size:
+        return None
+    if dtype is np.float32:
+        # Rows are as wide as the first comma or line separated group (3 for points, 2 for texture points)
+        width = len(FIRST_ROW.search(text).group().split())
+        if values.size % width:
+            return None
+        values = values.reshape(-1, width)
+    return values
+
+
+def parse_values(name, text, numeric=True):
+    # The value of an array field from the text between its brackets
+    values = parse_array(name, text) if numeric else None
+    if values is None:
+        values = [" ".join(row.split()) for row in text.split("\n") if row.strip()]
+    return values
+
+
+class LazyArray(object):
+
+    # The span of an array field's text in a memory-mapped file or a string, parsed only when its value is
+    # needed. Arrays that are never used are written back as the text they were read as
+
+    __slots__ = ("buffer", "start", "end", "name", "numeric")
+
+    def __init__(self, buffer, start, end, name, numeric=True):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+        self.name = name
+        self.numeric = numeric
+
+    def __repr__(self):
+        return "LazyArray(%r, %i bytes)" % (self.name, self.end - self.start)
+
+    def __reduce__(self):
+        # Mapped buffers cannot be pickled, so the text is copied, but it is still left unparsed
+        text = self.text()
+        return LazyArray, (text, 0, len(text), self.name, self.numeric)
+
+    def text(self):
+        text = self.buffer[self.start:self.end]
+        return text if text.__class__ is str else text.decode("utf8", "ignore")
+
+    def resolve(self):
+        return parse_values(self.name, self.text(), self.numeric)
+
+
+def float_words(values):
+    # The shortest text that reads back as each value in the array's own precision, as NumPy prints
+    # scalars, with whole numbers written without ".0"
+    return WHOLE.sub("", " ".join(map(str, values.ravel()))).split()
+
+
+def format_array(values, indent):
+    if values.ndim == 2:
+        row = indent + " ".join(["%s"] * values.shape[1])
+        return ",\n".join([row] * values.shape[0]) % tuple(float_words(values))
+    # One face (or polyline) per line, split after each -1 separator
+    text = indent + ", ".join(map(str, values.tolist()))
+    return text.replace("-1, ", "-1,\n" + indent)
@@ -0,0 +1,97 @@
+import contextlib
+import gzip
+import io
+import os
+import shutil
+import struct
+
+from ivtools.writer import BUFFER_SIZE
+
+GZIP_MAGIC = b"\x1f\x8b"
+# Compressed extensions and the extension of the scene inside
+COMPRESSED_EXTENSIONS = {".gz": None, ".wrz": ".wrl", ".ivz": ".iv"}
+COMPRESS_LEVEL = 6
+BINARY_HEADER = b"#Inventor V2.1 binary"
+
+
+def is_compressed(file_path):
+    # Detected by content rather than extension
+    with open(file_path, "rb") as file:
+        return file.read(2) == GZIP_MAGIC
+
+
+def is_binary(file_path):
+    # Binary Inventor files, plain or compressed, are told apart by their header
+    with open_input(file_path, binary=True) as file:
+        return file.read(len(BINARY_HEADER)) == BINARY_HEADER
+
+
+def open_input(file_path, binary=False):
+    # Text stream over a plain or gzip-compressed scene, decompressed as it is read, or a byte stream if binary
+    if is_compressed(file_path):
+        if binary:
+            return gzip.open(file_path, "rb")
+        return gzip.open(file_path, "rt", encoding="utf8", errors='ignore')
+    if binary:
+        return open(file_path, "rb")
+    return open(file_path, "r", encoding="utf8", errors='ignore')
+
+
+def open_output(file_path, compress=None, level=COMPRESS_LEVEL, binary=False):
+    # Compressed when compress is set, or by extension when it is None
+    if compress is None:
+        compress = split_ext(file_path)[2]
+    if compress:
+        file = io.BufferedWriter(gzip.GzipFile(file_path, "wb", compresslevel=level), BUFFER_SIZE)
+        return file if binary else io.TextIOWrapper(file, encoding="utf8")
+    return open(file_path, "wb" if binary else "w", buffering=BUFFER_SIZE)
+
+
+@contextlib.contextmanager
+def replace_output(file_path, compress=None, level=COMPRESS_LEVEL, binary=False):
+    # Writes a new file beside file_path and moves it over file_path once it is complete, so a failed write
+    # leaves the target as it was and a target that is also being read is not truncated under its reader
+    if compress is None:
+        compress = split_ext(file_path)[2]
+    path = temporary_path(file_path)
+    try:
+        with open_output(path, compress, level, binary) as file:
+            yield file
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, path)
+        os.replace(path, file_path)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def temporary_path(file_path):
+    # A new empty file beside file_path, created here so that no file is removed that was not
+    number = 0
+    while True:
+        path = "%s.%i.tmp" % (file_path, number)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+            return path
+        except FileExistsError:
+            number += 1
+
+
+def input_size(file_path):
+    # Size of the text inside the file, for progress; gzip stores it modulo 4 GB in its last four bytes
+    if not is_compressed(file_path):
+        return os.path.getsize(file_path)
+    with open(file_path, "rb") as file:
+        file.seek(-4, os.SEEK_END)
+        return struct.unpack("<I", file.read(4))[0]
+
+
+def split_ext(file_path):
+    # Returns the name, the scene extension and whether the extension marks the file as compressed
+    name, ext = os.path.splitext(file_path)
+    if ext not in COMPRESSED_EXTENSIONS:
+        return name, ext, False
+    if COMPRESSED_EXTENSIONS[ext] is not None:
+        return name, COMPRESSED_EXTENSIONS[ext], True
+    name, ext = os.path.splitext(name)
+    return name, ext, True
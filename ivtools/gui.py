@@ -1,15 +1,24 @@
 #!/usr/bin/env python3.6
 
+import logging
+import queue
+import threading
 import tkinter as tk
+from tkinter import ttk
 
 if __name__ == "__main__":
     import sys
     sys.path.append("..")
 
+from ivtools.convert import CONVERTERS
 from ivtools.editor import IVEditor
+from ivtools.metrics import Cancelled, Metrics
 
 PX = 5
 PY = 2
+FORMATS = {"iv": "OpenInventor", "wrl": "VRML 2.0"}
+# Milliseconds between checks for messages from the worker thread
+POLL_MS = 50
 
 
 class IVToolsGUI(tk.Frame):
@@ -17,7 +26,9 @@ class IVToolsGUI(tk.Frame):
     def __init__(self, master=None):
         tk.Frame.__init__(self, master)
         self.master = master
-        self.editor = IVEditor()
+        self.editor = IVEditor(metrics=Metrics(progress=self.__report))
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
         self.entries = {
             "read": tk.Entry(master),
             "load_template": tk.Entry(master),
@@ -34,6 +45,13 @@ class IVToolsGUI(tk.Frame):
             "delete": tk.Button(master, text="Delete", command=self.delete),
             "write": tk.Button(master, text="Write", command=self.write)
         }
+        self.actions = {
+            "convert_iv": tk.Button(master, text="Convert to IV", command=lambda: self.convert("iv")),
+            "convert_wrl": tk.Button(master, text="Convert to VRML", command=lambda: self.convert("wrl")),
+            "apply_nodes": tk.Button(master, text="Apply Nodes", command=self.apply_nodes)
+        }
+        self.progress = ttk.Progressbar(master, orient=tk.HORIZONTAL, mode="determinate")
+        self.cancel_button = tk.Button(master, text="Cancel", command=self.cancel, state=tk.DISABLED)
         self.feedback = tk.Label(self.master, text="Ready...")
         self.init_window()
 
@@ -48,98 +66,151 @@ class IVToolsGUI(tk.Frame):
         for row, ((_, entry), (_, button)) in enumerate(zip(self.entries.items(), self.buttons.items())):
             entry.grid(row=row, column=0, padx=PX, pady=PY, sticky=tk.EW, columnspan=3)
             button.grid(row=row, column=3, padx=PX, pady=PY, sticky=tk.EW)
-        tk.Button(self.master, text="Convert to IV", command=lambda: self.convert("iv")).grid(row=row + 1, column=0, padx=PX, pady=PY, sticky=tk.EW)
-        tk.Button(self.master, text="Convert to VRML", command=lambda: self.convert("wrl")).grid(row=row + 1, column=1, padx=PX, pady=PY, sticky=tk.EW)
-        tk.Button(self.master, text="Apply Nodes", command=self.apply_nodes).grid(row=row + 1, column=2, padx=PX, pady=PY, sticky=tk.EW)
+        self.actions["convert_iv"].grid(row=row + 1, column=0, padx=PX, pady=PY, sticky=tk.EW)
+        self.actions["convert_wrl"].grid(row=row + 1, column=1, padx=PX, pady=PY, sticky=tk.EW)
+        self.actions["apply_nodes"].grid(row=row + 1, column=2, padx=PX, pady=PY, sticky=tk.EW)
         tk.Button(self.master, text="Quit", command=quit).grid(row=row + 1, column=3, padx=PX, pady=PY, sticky=tk.EW)
-        self.feedback.grid(row=row + 2, column=0, padx=PX, pady=PY, columnspan=4, sticky=tk.W)
+        self.progress.grid(row=row + 2, column=0, padx=PX, pady=PY, columnspan=3, sticky=tk.EW)
+        self.cancel_button.grid(row=row + 2, column=3, padx=PX, pady=PY, sticky=tk.EW)
+        self.feedback.grid(row=row + 3, column=0, padx=PX, pady=PY, columnspan=4, sticky=tk.W)
 
     def read(self):
-        try:
-            file_path = self.entries["read"].get()
-            file_path = self.__process_file_path(file_path)
-            self.feedback.config(text="Loading data from %s ..." % file_path)
-            self.editor.read(file_path)
-            self.feedback.config(text="Success : Loaded data from %s" % file_path)
-        except FileNotFoundError:
-            self.feedback.config(text="Error : File not found")
-        except OSError as e:
-            self.feedback.config(text="Error : %s" % e)
+        file_path = self.__process_file_path(self.entries["read"].get())
+        self.__start(
+            "Loading data from %s ..." % file_path,
+            lambda: self.editor.read(file_path),
+            lambda _: "Success : Loaded data from %s" % file_path,
+            cancellable=True
+        )
 
     def write(self):
         if self.editor.data is None:
             self.feedback.config(text="Error : No data to write")
         else:
-            try:
-                self.feedback.config(text="Writing data to %s ..." % self.entries["write"].get())
-                self.editor.write(self.entries["write"].get())
-                self.feedback.config(text="Success : Wrote data to %s" % self.entries["write"].get())
-            except FileNotFoundError:
-                self.feedback.config(text="Error : File not found")
+            file_path = self.entries["write"].get()
+            self.__start(
+                "Writing data to %s ..." % file_path,
+                lambda: self.editor.write(file_path),
+                lambda _: "Success : Wrote data to %s" % file_path,
+                cancellable=True
+            )
 
     def load_template(self):
-        file_path = self.entries["load_template"].get()
-        file_path = self.__process_file_path(file_path)
-        try:
-            self.feedback.config(text="Loading template nodes from %s ..." % file_path)
+        file_path = self.__process_file_path(self.entries["load_template"].get())
+
+        def job():
             self.editor.load_template_file(file_path)
-            self.feedback.config(text="Success : Loaded template nodes from %s" % file_path)
-        except FileNotFoundError:
-            self.feedback.config(text="Error : File not found")
-        self.editor.template_nodes.print()
+            self.editor.template_nodes.print()
+
+        self.__start(
+            "Loading template nodes from %s ..." % file_path,
+            job,
+            lambda _: "Success : Loaded template nodes from %s" % file_path
+        )
 
     def write_nodes(self):
-        # try:
-        file_path = self.entries["write_nodes"].get()
-        file_path = self.__process_file_path(file_path)
-        self.feedback.config(text="Writing nodes to %s ..." % file_path)
-        self.editor.write_nodes_file(file_path)
-        self.feedback.config(text="Success : Written nodes to %s" % file_path)
-        # except FileNotFoundError:
-        #     self.feedback.config(text="Error : File not found")
-        # except AttributeError:
-        #     self.feedback.config(text="Error : Invalid data or template")
+        file_path = self.__process_file_path(self.entries["write_nodes"].get())
+        self.__start(
+            "Writing nodes to %s ..." % file_path,
+            lambda: self.editor.write_nodes_file(file_path),
+            lambda _: "Success : Written nodes to %s" % file_path
+        )
 
     def load_nodes(self):
-        try:
-            self.feedback.config(text="Loading nodes from %s ..." % self.entries["load_nodes"].get())
-            self.editor.load_nodes_file(self.entries["load_nodes"].get())
-            self.feedback.config(text="Success : Loaded nodes from %s" % self.entries["load_nodes"].get())
-        except FileNotFoundError:
-            self.feedback.config(text="Error : File not found")
+        file_path = self.entries["load_nodes"].get()
+        self.__start(
+            "Loading nodes from %s ..." % file_path,
+            lambda: self.editor.load_nodes_file(file_path),
+            lambda _: "Success : Loaded nodes from %s" % file_path
+        )
 
     def delete(self):
-        if self.entries["delete"].get():
-            #try:
-            self.feedback.config(text="Deleting all %s nodes ..." % self.entries["delete"].get())
-            self.editor.delete(self.entries["delete"].get())
-            self.feedback.config(text="Success : Deleted all %s nodes" % self.entries["delete"].get())
-            #except AttributeError:
-            #    self.feedback.config(text="Error : Invalid data")
+        node_name = self.entries["delete"].get()
+        if node_name:
+            self.__start(
+                "Deleting all %s nodes ..." % node_name,
+                lambda: self.editor.delete(node_name),
+                lambda _: "Success : Deleted all %s nodes" % node_name
+            )
         else:
             self.feedback.config(text="Error : Nothing to delete")
 
     def convert(self, ext):
-        if ext == "iv":
-            #try:
-            self.feedback.config(text="Converting data to OpenInventor format ...")
-            self.editor.convert(ext)
-            self.feedback.config(text="Success : Converted data to OpenInventor format")
-            #except AttributeError:
-            #    self.feedback.config(text="Error : Invalid data to convert")
+        # Conversion reports no progress, which is where a cancel would be raised, so it runs to the end
+        if ext in CONVERTERS:
+            self.__start(
+                "Converting data to %s format ..." % FORMATS[ext],
+                lambda: self.editor.convert(ext),
+                lambda _: "Success : Converted data to %s format" % FORMATS[ext]
+            )
         else:
             self.feedback.config(text="NotImplementedError : Cannot convert to %s format" % ext)
 
     def apply_nodes(self):
-        #try:
-        self.feedback.config(text="Applying new nodes to data ...")
-        self.editor.apply_nodes()
-        self.feedback.config(text="Success : New nodes applied to data")
-        #except AttributeError:
-        # self.feedback.config(text="Error : Invalid data or nodes")
+        self.__start(
+            "Applying new nodes to data ...",
+            self.editor.apply_nodes,
+            lambda report: "Success : New nodes applied to data (%s)" % report
+        )
+
+    def cancel(self):
+        self.cancelled.set()
+        self.feedback.config(text="Cancelling ...")
+
+    def __start(self, message, job, success, cancellable=False):
+        # Runs job on a worker thread; success builds the feedback text from its result
+        self.cancelled.clear()
+        self.__set_busy(True, cancellable)
+        self.feedback.config(text=message)
+        self.progress.config(mode="indeterminate", value=0)
+        self.progress.start()
+        threading.Thread(target=self.__work, args=(job, success), daemon=True).start()
+        self.after(POLL_MS, self.__poll)
+
+    def __work(self, job, success):
+        try:
+            self.messages.put(("done", success(job())))
+        except Cancelled:
+            self.messages.put(("done", "Cancelled"))
+        except FileNotFoundError:
+            self.messages.put(("done", "Error : File not found"))
+        except Exception as e:
+            self.messages.put(("done", "Error : %s" % e))
+
+    def __report(self, phase, done, total):
+        # Called on the worker thread by the editor
+        if self.cancelled.is_set():
+            raise Cancelled()
+        self.messages.put(("progress", done, total))
+
+    def __poll(self):
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "progress":
+                if self.progress["mode"] != "determinate":
+                    self.progress.stop()
+                    self.progress.config(mode="determinate")
+                self.progress.config(maximum=max(message[2], 1), value=message[1])
+            else:
+                self.progress.stop()
+                self.progress.config(mode="determinate", value=0)
+                self.feedback.config(text=message[1])
+                self.__set_busy(False)
+                return
+        self.after(POLL_MS, self.__poll)
+
+    def __set_busy(self, busy, cancellable=False):
+        state = tk.DISABLED if busy else tk.NORMAL
+        for button in list(self.buttons.values()) + list(self.actions.values()):
+            button.config(state=state)
+        self.cancel_button.config(state=tk.NORMAL if busy and cancellable else tk.DISABLED)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     root = tk.Tk()
     app = IVToolsGUI(root)
     app.mainloop()
@@ -0,0 +1,102 @@
+from ivtools.node import ApplyReport
+from ivtools.traverse import SKIP, walk
+
+
+class NodeIndex(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.parents = {}
+        # Every parent of the nodes shared through USE, which parents holds the first of
+        self.shared = {}
+        self.names = {}
+        self.defs = {}
+        self.types = {}
+        self.__add_children(data)
+
+    def __len__(self):
+        return len(self.parents)
+
+    def find(self, def_name=None, node_type=None):
+        if def_name is not None:
+            nodes = self.defs.get(def_name, {})
+            if node_type is not None:
+                nodes = [node for node in nodes if node.type == node_type]
+        elif node_type is not None:
+            nodes = self.types.get(node_type, {})
+        else:
+            nodes = self.parents
+        return list(nodes)
+
+    def parent(self, node):
+        parent = self.parents[node]
+        return None if parent is self.data else parent
+
+    def add(self, node, parent):
+        self.__insert(node, parent)
+        self.__add_children(node)
+
+    def remove(self, node):
+        # Shared nodes below node stay indexed while a parent outside it still holds them
+        self.__forget(node)
+        walk(node, lambda child, parent, depth: self.__forget(child) if self.__unlink(child, parent) else SKIP)
+
+    def delete(self, name):
+        # Returns the deleted nodes with their parents, once for each place a shared node was used
+        deleted = []
+        for node in list(self.names.get(name, {})):
+            # Skip nodes that were removed along with a deleted ancestor
+            if node in self.parents:
+                for parent in self.shared.get(node, [self.parents[node]]):
+                    parent.remove_node(node)
+                    deleted.append((node, parent))
+                self.remove(node)
+        return deleted
+
+    def apply_nodes(self, new_nodes):
+        report = ApplyReport()
+        for def_name, nodes in new_nodes.get().items():
+            for node in list(self.defs.get(def_name, {})):
+                for child in node.apply_node(nodes, report):
+                    self.add(child, node)
+        return report
+
+    def __add_children(self, node):
+        walk(node, lambda child, parent, depth: self.__insert(child, parent))
+
+    def __insert(self, node, parent):
+        # Returns SKIP for shared nodes that are already indexed, along with the nodes below them
+        if node in self.parents:
+            self.shared.setdefault(node, [self.parents[node]]).append(parent)
+            return SKIP
+        self.parents[node] = parent
+        self.names.setdefault(node.name, {})[node] = None
+        self.types.setdefault(node.type, {})[node] = None
+        if node.def_name is not None:
+            self.defs.setdefault(node.def_name, {})[node] = None
+
+    def __forget(self, node):
+        del self.parents[node]
+        self.shared.pop(node, None)
+        self.__discard(self.names, node.name, node)
+        self.__discard(self.types, node.type, node)
+        self.__discard(self.defs, node.def_name, node)
+
+    def __unlink(self, node, parent):
+        # Drops one parent of a node, returning whether it has none left
+        parents = self.shared.get(node)
+        if parents is None:
+            return True
+        parents.remove(parent)
+        self.parents[node] = parents[0]
+        if len(parents) == 1:
+            del self.shared[node]
+        return False
+
+    @staticmethod
+    def __discard(index, key, node):
+        nodes = index.get(key)
+        if nodes is not None:
+            nodes.pop(node, None)
+            if not nodes:
+                del index[key]
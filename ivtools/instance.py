@@ -0,0 +1,154 @@
+import hashlib
+
+import numpy as np
+
+from ivtools.fields import LazyArray
+from ivtools.traverse import SKIP, walk
+
+# Shared nodes without a DEF name of their own are named this, followed by a number
+PREFIX = "instance_"
+
+
+class InstanceReport(object):
+
+    def __init__(self):
+        self.nodes = 0
+        self.shared = 0
+        self.references = 0
+        self.nodes_removed = 0
+
+    def __str__(self):
+        return "%i nodes: %i shared by %i USE references, %i nodes removed" % (
+            self.nodes, self.shared, self.references, self.nodes_removed
+        )
+
+
+class Instancer(object):
+
+    # Replaces repeated identical subtrees with one shared node, which is written once under a DEF name and
+    # then as USE. Subtrees are hashed bottom-up in one traversal, then the largest repeated ones are shared
+    # from the top down, so the subtrees inside them are not named as well. Subtrees holding DEF nodes are
+    # left alone, as their names may be edited or used elsewhere
+
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self.report = InstanceReport()
+        # Kept across calls for streams, where names must stay unique in the whole file
+        self.names = set()
+        self.next_name = 0
+
+    def instance_data(self, data):
+        digests = self.digests(data)
+        counts = {}
+        for node, digest in digests.items():
+            if digest is not None:
+                counts[digest] = counts.get(digest, 0) + 1
+        # The first copy of each repeated subtree met from the top down, which the others are replaced with.
+        # Copies inside a replaced subtree are never met, so they are not shared on their own
+        first = {}
+        seen = set()
+
+        def enter(node, parent, depth):
+            if node.def_name is not None:
+                if node in seen:
+                    return SKIP
+                seen.add(node)
+            self.__share(node, digests, counts, first, seen)
+
+        self.__share(data, digests, counts, first, seen)
+        walk(data, enter)
+        self.report.nodes += len(digests)
+        return self.report
+
+    def digests(self, data):
+        # A digest of each node below data that may be shared: its name, comment, fields in order and the
+        # digests of its child nodes. Nodes that hold a DEF node, or are one, have None
+        digests = {}
+
+        def enter(node, parent, depth):
+            if node.def_name is not None:
+                self.names.add(node.def_name)
+            # Nodes already shared through USE are hashed once
+            return SKIP if node in digests else None
+
+        def leave(node, parent, depth):
+            digests[node] = digest(node, digests)
+
+        walk(data, enter, leave)
+        return digests
+
+    def __share(self, node, digests, counts, first, seen):
+        # Replaces the children of node that repeat an earlier subtree with that subtree
+        children = node.children
+        for i, child in enumerate(children):
+            if child.__class__ is str or not shareable(child):
+                continue
+            key = digests.get(child)
+            if key is None or counts[key] < 2:
+                continue
+            original = first.setdefault(key, child)
+            if original is child:
+                continue
+            if original.def_name is None:
+                original.name = self.__shared_name(original)
+                seen.add(original)
+                self.report.shared += 1
+            children[i] = original
+            self.report.references += 1
+            self.report.nodes_removed += size(child)
+
+    def __shared_name(self, node):
+        name = "%s%i" % (self.prefix, self.next_name)
+        while name in self.names:
+            self.next_name += 1
+            name = "%s%i" % (self.prefix, self.next_name)
+        self.names.add(name)
+        self.next_name += 1
+        words = [node.field] if node.field else []
+        return " ".join(words + ["DEF", name, node.type])
+
+
+def shareable(node):
+    # Node lists are part of the field that holds them, and empty nodes are shorter than a USE
+    return node.def_name is None and node.type != "[" and bool(node.children)
+
+
+def digest(node, digests):
+    if node.def_name is not None:
+        return None
+    h = hashlib.blake2b(digest_size=16)
+    h.update(("%s\0%s\0%s\0" % (node.field, node.type, node.comment)).encode())
+    for child in node.children:
+        if child.__class__ is str:
+            h.update(b"F%s\0" % child.encode())
+            update(h, node.fields[child])
+        else:
+            child_digest = digests[child]
+            if child_digest is None:
+                return None
+            h.update(b"N")
+            h.update(child_digest)
+    return h.digest()
+
+
+def update(h, value):
+    # Values of different kinds never hash alike. Unparsed arrays are compared as text
+    if isinstance(value, np.ndarray):
+        h.update(b"A%s%r\0" % (value.dtype.str.encode(), value.shape))
+        h.update(np.ascontiguousarray(value).data)
+    elif value.__class__ is LazyArray:
+        h.update(b"L%i\0" % len(value.text()))
+        h.update(value.text().encode())
+    elif isinstance(value, list):
+        h.update(b"R%i\0" % len(value))
+        for row in value:
+            h.update(b"%s\0" % str(row).encode())
+    else:
+        h.update(b"V%s\0" % repr(value).encode())
+
+
+def size(node):
+    # The nodes in a subtree
+    count = [1]
+    walk(node, lambda child, parent, depth: count.__setitem__(0, count[0] + 1))
+    return count[0]
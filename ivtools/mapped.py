@@ -0,0 +1,70 @@
+import mmap
+import os
+import re
+from sys import intern
+
+from ivtools.events import FIELD
+from ivtools.fields import LazyArray
+from ivtools.parser import IVParser
+
+# Arrays with shorter bodies are decoded with their line, as IVParser reads them
+LAZY_SIZE = 1024
+# An array body is left unparsed only if it holds none of these
+ARRAY_SKIP = re.compile(rb"[{}\[#]")
+
+
+class MappedParser(IVParser):
+
+    # Follows IVParser over a memory-mapped file, but leaves large array bodies as spans of the map.
+    # The map stays open for as long as any of its fields do
+
+    def __init__(self, numeric=True, lazy_size=LAZY_SIZE):
+        IVParser.__init__(self, numeric)
+        self.lazy_size = lazy_size
+
+    def read(self, file_path):
+        return IVParser.read(self, self.map(file_path))
+
+    @staticmethod
+    def map(file_path):
+        if not os.path.getsize(file_path):
+            # Empty files cannot be mapped
+            return b""
+        with open(file_path, "rb") as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def events(self, buffer):
+        return self.tokenize(MappedLines(buffer))
+
+    def array(self, lines, text, prefix):
+        # The body of the array, if it is large and plain enough to leave unparsed
+        buffer = lines.buffer
+        start = lines.start + len(prefix.encode())
+        end = buffer.find(b"]", start)
+        if end - start < self.lazy_size or ARRAY_SKIP.search(buffer, start, end) is not None:
+            return None
+        # Carry on from the closing bracket as if it started a line
+        lines.position = end + 1
+        name = intern("".join(text).strip())
+        return FIELD, name, LazyArray(buffer, start, end, name, self.numeric)
+
+
+class MappedLines(object):
+
+    # The decoded lines of a buffer. Moving position ahead skips the bytes before it
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.size = len(buffer)
+        self.start = 0
+        self.position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = self.start = self.position
+        if start >= self.size:
+            raise StopIteration
+        end = self.position = self.buffer.find(b"\n", start) + 1 or self.size
+        return self.buffer[start:end].decode("utf8", "ignore")
@@ -0,0 +1,89 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from logging import DEBUG, INFO
+
+logger = logging.getLogger("ivtools")
+
+# Characters read between progress reports
+PROGRESS_STEP = 1 << 16
+
+
+def log(level, message):
+    logger.log(level, message)
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Metrics(object):
+
+    # Messages are only formatted when a callback is set and the level is enabled, so a silent
+    # instance costs a comparison per message while counters and timers keep running
+
+    def __init__(self, callback=log, level=INFO, progress=None):
+        self.callback = callback
+        self.level = level
+        # Called as progress(phase, done, total); it may raise Cancelled to stop the operation
+        self.on_progress = progress
+        self.counters = {}
+        self.timers = {}
+
+    @classmethod
+    def silent(cls):
+        return cls(callback=None)
+
+    def enabled(self, level):
+        return self.callback is not None and level >= self.level
+
+    def emit(self, level, message, *args):
+        if self.callback is not None and level >= self.level:
+            self.callback(level, message % args if args else message)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def progress(self, phase, done, total):
+        if self.on_progress is not None:
+            self.on_progress(phase, done, total)
+
+    def track(self, phase, lines, total):
+        # Passes lines through, reporting the characters seen so far
+        done = 0
+        mark = PROGRESS_STEP
+        for line in lines:
+            done += len(line)
+            if done >= mark:
+                self.progress(phase, done, total)
+                mark = done + PROGRESS_STEP
+            yield line
+        self.progress(phase, total, total)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - start
+
+    def merge(self, summary):
+        for name, n in summary["counters"].items():
+            self.count(name, n)
+        for name, seconds in summary["timers"].items():
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def reset(self):
+        self.counters = {}
+        self.timers = {}
+
+    def summary(self):
+        return {"counters": dict(self.counters), "timers": dict(self.timers)}
+
+    def __str__(self):
+        return ", ".join(
+            ["%s %.3fs" % item for item in self.timers.items()] +
+            ["%s %i" % item for item in self.counters.items()]
+        )
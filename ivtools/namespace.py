@@ -1,5 +1,25 @@
+import os
+from functools import lru_cache
+
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+def load_yaml(file_path):
+    # Documents are shared between loads of an unchanged file, so callers must not modify them
+    stat = os.stat(file_path)
+    return _load_yaml(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=32)
+def _load_yaml(file_path, mtime, size):
+    with open(file_path, "r") as file:
+        return yaml.load(file, Loader=SafeLoader)
+
 
 class Namespace(object):
 
@@ -65,47 +85,6 @@ class Namespace(object):
         else:
             return self.__dict__
 
-    def delete(self, key, recursive=True, parent=None):
-        to_delete = []
-        for name, item in self.__dict__.items():
-            if isinstance(item, Namespace) and "NAME" in item.__dict__ and key == item.NAME:
-                to_delete.append(name)
-        for name in to_delete:
-            del self.__dict__[name]
-            print("%s node deleted from %s" % (key, parent))
-        if recursive:
-            for _, item in self.__dict__.items():
-                if isinstance(item, Namespace) and "CHILDREN" in item.__dict__:
-                    item.CHILDREN.delete(key, recursive=True, parent=item.NAME)
-
-    def write(self, file_path, tab_size=2, tabs=0):
-        for name, data in self.__dict__.items():
-            if name.startswith("NODE"):
-                with open(file_path, "a") as file:
-                    if data.COMMENT is None:
-                        file.write("%s%s {\n" % (" " * tabs * tab_size, data.NAME))
-                    else:
-                        file.write("%s%s { # %s\n" % (" " * tabs * tab_size, data.NAME, data.COMMENT))
-                data.CHILDREN.write(file_path, tab_size=tab_size, tabs=tabs+1)
-                with open(file_path, "a") as file:
-                    file.write("%s}\n" % (" " * tabs * tab_size))
-            else:
-                with open(file_path, "a") as file:
-                    if isinstance(data, list):
-                        if len(data) == 1:
-                            file.write("%s%s [ %s ]\n" % (" " * tabs * tab_size, name, data[0]))
-                        else:
-                            file.write(
-                                "%s%s [\n%s\n%s]\n" % (
-                                    " " * tabs * tab_size,
-                                    name,
-                                    "\n".join(["%s%s" % (" " * tab_size * (tabs + 1), item) for item in data]),
-                                    " " * tabs * tab_size
-                                )
-                            )
-                    else:
-                        file.write("%s%s %s\n" % (" " * tabs * tab_size, name, data))
-
     def __write_node(self):
         pass
 
@@ -119,8 +98,7 @@ class Namespace(object):
     def __add_args(self, args, sub_space):
         for arg in args:
             if isinstance(arg, str):
-                with open(arg, "r") as file:
-                    arg = yaml.load(file)
+                arg = load_yaml(arg)
             self.__add_dict(arg, sub_space=sub_space)
 
     def __add_dict(self, dictionary, sub_space):
@@ -145,84 +123,6 @@ class Namespace(object):
                 break
         return lines
 
-    def get_nodes(self):
-        nodes = []
-        for name, node in vars(self).items():
-            if name.startswith("NODE"):
-                if node.NAME.startswith("DEF"):
-                    nodes.append(node.NAME.split(" ")[1])
-                nodes += node.CHILDREN.get_nodes()
-        return nodes
-
-    def apply_nodes(self, new_nodes):
-        # For each data node
-        for parent_name, parent in vars(self).items():
-            # Check the node name is in the new_nodes yaml file
-            if parent_name.startswith("NODE") and \
-                    parent.NAME.startswith("DEF") and \
-                    parent.NAME.split(" ")[1] in vars(new_nodes):
-                parent_node_name = parent.NAME.split(" ")[1]
-                print("%s:" % parent_node_name)
-                # For each new node to be applied to the parent_node
-                for new_node_name, new_node in new_nodes.get(parent_node_name).get().items():
-                    # Check if the new node already exists as a child
-                    already_exists = False
-                    for child_name, child_node in vars(parent.CHILDREN).items():
-                        if child_name.startswith("NODE") and child_node.NAME == new_node_name:
-                            for field_name, field_value in new_node.get().items():
-                                # If the field already exists
-                                if field_name in child_node.CHILDREN.get():
-                                    print("\t%s:" % new_node_name)
-                                    already_exists = True
-                                    # If the field value is already correct
-                                    if child_node.CHILDREN.get(field_name) == field_value:
-                                        print(
-                                            "\t\tNot changing %s field with value: %s" % (
-                                                field_name, field_value
-                                            )
-                                        )
-                                    else:
-                                        child_node.CHILDREN.get()[field_name] = field_value
-                                        print(
-                                            "\t\tChanging %s field value from %s to %s" % (
-                                                field_name, child_node.CHILDREN.get(field_name), field_value
-                                            )
-                                        )
-                                else:
-                                    child_node.CHILDREN.get()[field_name] = field_value
-                                    print(
-                                        "\t\tAdded new field %s with value %s" %
-                                        (field_name, field_value)
-                                    )
-                    if not already_exists:
-                        print("\tAdded new node %s:" % new_node_name)
-                        for field_name, field_value in new_node.get().items():
-                            print(
-                                "\t\t%s: %s" %
-                                (field_name, field_value)
-                            )
-                        n = 0
-                        while True:
-                            name = "NODE_%i" % n
-                            if name in parent.CHILDREN.get():
-                                n += 1
-                            else:
-                                break
-                        children = parent.CHILDREN
-                        parent.CHILDREN = Namespace(
-                            {
-                                name: {
-                                    "NAME": new_node_name,
-                                    "COMMENT": None,
-                                    "CHILDREN": new_node.get()
-                                }
-                            },
-                            children.get()
-                        )
-
-            if parent_name.startswith("NODE"):
-                parent.CHILDREN.apply_nodes(new_nodes)
-
 
 if __name__ == "__main__":
 
@@ -0,0 +1,244 @@
+from sys import intern
+
+import numpy as np
+
+from ivtools.fields import LazyArray
+from ivtools.traverse import SKIP, descendants, walk
+
+
+class Node(object):
+
+    # children holds the child nodes and, in document order, the names of the fields stored in fields
+
+    __slots__ = ("field", "def_name", "type", "comment", "children", "fields")
+
+    def __init__(self, name="", comment=None, fields=None):
+        self.name = name
+        self.comment = comment
+        self.children = []
+        self.fields = {}
+        if fields is not None:
+            for field_name, value in fields.items():
+                self.set_field(field_name, value)
+
+    @classmethod
+    def create(cls, field, def_name, node_type, comment=None):
+        # Builds an empty node from the parts of its name, which are not parsed again
+        node = cls.__new__(cls)
+        node.field = field
+        node.def_name = def_name
+        node.type = node_type
+        node.comment = comment
+        node.children = []
+        node.fields = {}
+        return node
+
+    def __repr__(self):
+        return "Node(%r)" % self.name
+
+    def __len__(self):
+        return len(self.children)
+
+    def __reduce__(self):
+        # Pickled as a flat pre-order list of node states, so deep trees do not hit the recursion limit.
+        # None marks where each child node goes. DEF nodes shared through USE are stored once, at their first
+        # place, and their other places are listed as (node, slot, shared node) positions in the list
+        states = []
+        places = {}
+        shared = []
+        # The state of each node being walked and its child node slots left to fill, in order
+        open_nodes = {}
+
+        def store(node):
+            children = [child if child.__class__ is str else None for child in node.children]
+            slots = iter([i for i, child in enumerate(children) if child is None])
+            open_nodes[node] = len(states), children, slots
+            states.append((node.field, node.def_name, node.type, node.comment, node.fields, children))
+
+        def enter(node, parent, depth):
+            place, children, slots = open_nodes[parent]
+            i = next(slots)
+            if node.def_name is not None:
+                if node in places:
+                    children[i] = False
+                    shared.append((place, i, places[node]))
+                    return SKIP
+                places[node] = len(states)
+            store(node)
+
+        store(self)
+        walk(self, enter, lambda node, parent, depth: open_nodes.pop(node))
+        return load_tree, (states, shared)
+
+    @property
+    def name(self):
+        words = [self.field] if self.field else []
+        if self.def_name is not None:
+            words += ["DEF", self.def_name]
+        if self.type:
+            words.append(self.type)
+        return " ".join(words)
+
+    @name.setter
+    def name(self, name):
+        # Field and type names repeat across the scene, so they are interned
+        words = name.split()
+        if "DEF" in words[:-1]:
+            i = words.index("DEF")
+            self.field = intern(" ".join(words[:i])) or None
+            self.def_name = words[i + 1]
+            self.type = intern(" ".join(words[i + 2:]))
+        else:
+            self.field = intern(" ".join(words[:-1])) or None
+            self.def_name = None
+            self.type = intern(words[-1]) if words else ""
+
+    def nodes(self):
+        return [child for child in self.children if child.__class__ is Node]
+
+    def add_node(self, node, index=None):
+        if index is None:
+            self.children.append(node)
+        else:
+            self.children.insert(index, node)
+
+    def remove_node(self, node):
+        self.children.remove(node)
+
+    def get_field(self, name):
+        # Parses arrays left unparsed by a read, keeping the result
+        value = self.fields[name]
+        if value.__class__ is LazyArray:
+            value = self.fields[name] = value.resolve()
+        return value
+
+    def set_field(self, name, value):
+        if name not in self.fields:
+            self.children.append(name)
+        self.fields[name] = value
+
+    def remove_field(self, name):
+        if name in self.fields:
+            del self.fields[name]
+            self.children.remove(name)
+
+    def delete(self, name, recursive=True):
+        # Returns the deleted nodes with their parents
+        deleted = []
+
+        def enter(node, parent, depth):
+            if node.name == name:
+                deleted.append((node, parent))
+                return SKIP
+            return None if recursive else SKIP
+
+        walk(self, enter)
+        for node, parent in deleted:
+            parent.remove_node(node)
+        return deleted
+
+    def get_nodes(self):
+        return list(self.iter_nodes())
+
+    def iter_nodes(self):
+        # DEF names in document order, including repeats
+        for node in descendants(self):
+            if node.def_name is not None:
+                yield node.def_name
+
+    def apply_nodes(self, new_nodes, report=None):
+        report = ApplyReport() if report is None else report
+        targets = vars(new_nodes)
+
+        def enter(node, parent, depth):
+            # Check the node name is in the new_nodes yaml file
+            if node.def_name is not None and node.def_name in targets:
+                node.apply_node(targets[node.def_name], report)
+
+        walk(self, enter)
+        return report
+
+    def apply_node(self, new_nodes, report=None):
+        # Applies new child nodes to this DEF node, returning the children that were added
+        report = ApplyReport() if report is None else report
+        report.nodes += 1
+        children = {}
+        for child in self.nodes():
+            children.setdefault(child.name, []).append(child)
+        added = []
+        for new_node_name, new_node in new_nodes.get().items():
+            fields = vars(new_node) if new_node is not None else {}
+            if new_node_name not in children:
+                added.append(Node(new_node_name, fields=fields))
+                continue
+            for child in children[new_node_name]:
+                for field_name, value in fields.items():
+                    if field_name not in child.fields:
+                        child.set_field(field_name, value)
+                        report.fields_added += 1
+                    elif same_value(child.fields[field_name], value):
+                        report.fields_unchanged += 1
+                    else:
+                        child.fields[field_name] = value
+                        report.fields_changed += 1
+        if added:
+            # New nodes go in front of the existing children, the last one first
+            added.reverse()
+            self.children[0:0] = added
+            report.nodes_added += len(added)
+        return added
+
+
+class ApplyReport(object):
+
+    def __init__(self):
+        self.nodes = 0
+        self.nodes_added = 0
+        self.fields_added = 0
+        self.fields_changed = 0
+        self.fields_unchanged = 0
+
+    def __str__(self):
+        return "%i DEF nodes: %i nodes added, %i fields added, %i changed, %i unchanged" % (
+            self.nodes, self.nodes_added, self.fields_added, self.fields_changed, self.fields_unchanged
+        )
+
+
+def load_tree(states, shared=()):
+    # Rebuilds a tree pickled by Node.__reduce__. Not walk, as the child slots are None until they are filled here
+    nodes = []
+    for field, def_name, node_type, comment, fields, children in states:
+        node = Node.__new__(Node)
+        node.field = field
+        node.def_name = def_name
+        node.type = node_type
+        node.comment = comment
+        node.fields = fields
+        node.children = children
+        nodes.append(node)
+    following = iter(nodes[1:])
+    stack = [(nodes[0], empty_slots(nodes[0]))]
+    while stack:
+        node, slots = stack[-1]
+        for i in slots:
+            child = next(following)
+            node.children[i] = child
+            stack.append((child, empty_slots(child)))
+            break
+        else:
+            stack.pop()
+    for place, i, shared_place in shared:
+        nodes[place].children[i] = nodes[shared_place]
+    return nodes[0]
+
+
+def empty_slots(node):
+    return (i for i, child in enumerate(node.children) if child is None)
+
+
+def same_value(a, b):
+    if a.__class__ is LazyArray:
+        a = a.resolve()
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(a, b)
+    return a == b
@@ -0,0 +1,146 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ivtools.events import HEADER
+from ivtools.node import Node
+from ivtools.parser import IVParser, TreeBuilder, resolve
+
+# Top-level nodes are sent to the workers in chunks of about this many characters
+CHUNK_SIZE = 4 << 20
+NEWLINE, HASH, OPEN, CLOSE, OPEN_BRACE, CLOSE_BRACE = b"\n#[]{}"
+
+
+class ParallelParser(object):
+
+    # Splits the scene between top-level nodes and parses the pieces in worker processes. The pieces are
+    # merged in order, so the tree is the same as IVParser builds
+
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE, numeric=True):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.numeric = numeric
+
+    def read(self, file):
+        # The whole text is needed to cut it into chunks
+        text = file.read() if hasattr(file, "read") else "".join(file)
+        chunks = enumerate(self.chunks(text))
+        if self.workers < 2:
+            return merge(parse_chunk(chunk, self.numeric, not i) for i, chunk in chunks)
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return merge(self.__submit(executor, chunks))
+
+    def __submit(self, executor, chunks):
+        # A few chunks per worker are queued, and the rest are cut as the first are merged
+        pending = []
+        for i, chunk in chunks:
+            pending.append(executor.submit(parse_chunk, chunk, self.numeric, not i))
+            if len(pending) > 2 * self.workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+    def chunks(self, text):
+        # Follows the depth, open field and node list state of IVParser.events through the brackets outside
+        # comments, which are all that change it, and cuts after a line that leaves the parser at the top level
+        # with no text carried into the next node name. The header runs to the first line with a brace
+        raw = text.encode("utf8")
+        header_end = raw.find(b"{")
+        if header_end < 0:
+            yield text
+            return
+        data = np.frombuffer(raw, np.uint8)
+        marks = np.flatnonzero((data == OPEN_BRACE) | (data == CLOSE_BRACE) | (data == OPEN) | (data == CLOSE))
+        newlines = np.flatnonzero(data == NEWLINE)
+        ends = np.append(newlines + 1, len(raw))[np.searchsorted(newlines, marks)]
+        hashes = np.flatnonzero(data == HASH)
+        if len(hashes):
+            # Drop the brackets that follow a # on their line
+            before = hashes[np.maximum(np.searchsorted(hashes, marks) - 1, 0)]
+            starts = np.insert(newlines + 1, 0, 0)[np.searchsorted(newlines, marks)]
+            keep = (before > marks) | (before < starts)
+            marks = marks[keep]
+            ends = ends[keep]
+        chars = data[marks]
+
+        position = 0
+        line_end = 0
+        last = 0
+        depth = 0
+        field_open = False
+        lists = []
+        for mark, char, end in zip(marks.tolist(), chars.tolist(), ends.tolist()):
+            if end != line_end:
+                if self.__cut(raw, position, line_end, last, header_end, depth, field_open, lists):
+                    yield raw[position:line_end].decode("utf8")
+                    position = line_end
+                line_end = end
+            last = mark
+            if char == OPEN_BRACE:
+                if field_open:
+                    lists.append(depth)
+                    depth += 1
+                    field_open = False
+                depth += 1
+            elif char == CLOSE_BRACE:
+                if depth:
+                    depth -= 1
+            elif char == OPEN:
+                field_open = True
+            elif not field_open and lists and lists[-1] == depth - 1:
+                lists.pop()
+                depth -= 1
+            else:
+                field_open = False
+        if self.__cut(raw, position, line_end, last, header_end, depth, field_open, lists):
+            yield raw[position:line_end].decode("utf8")
+            position = line_end
+        yield raw[position:].decode("utf8")
+
+    def __cut(self, raw, position, line_end, last, header_end, depth, field_open, lists):
+        # Whether to cut after the line whose last bracket is at last. Cuts are at line ends,
+        # so they never split a character
+        if line_end - position < self.chunk_size or depth or field_open or lists:
+            return False
+        if raw.rfind(b"\n", 0, last) < header_end:
+            return False
+        return not raw[last + 1:line_end].split(b"#")[0].strip()
+
+
+def parse_chunk(text, numeric=True, first=False):
+    # Returns the header, for the first chunk, the tree and whether it has USE references it could not resolve.
+    # Later chunks come after the header wherever their own first brace is. StringIO splits lines on newlines
+    # only, as files are read
+    events = IVParser(numeric).events(io.StringIO(text))
+    header = next(events)[1] if first else None
+    builder = TreeBuilder()
+    builder.feed(event for event in events if event[0] != HEADER)
+    return header, builder.root, builder.unresolved
+
+
+def merge(results):
+    # Top-level fields repeated across chunks keep their first place, as set_field does in a serial parse.
+    # References to DEF nodes in earlier chunks are resolved here, in document order. The DEF nodes of earlier
+    # chunks are only collected once a chunk refers past itself, as pickled trees do not share nodes with
+    # anything sent along with them
+    header, data, _ = next(results)
+    defs = {}
+    pending = [list(data.nodes())]
+    for _, chunk, unresolved in results:
+        if unresolved:
+            for nodes in pending:
+                collected = Node()
+                collected.children = nodes
+                resolve(collected, defs)
+            pending = []
+            resolve(chunk, defs)
+        else:
+            pending.append(chunk.nodes())
+        for child in chunk.children:
+            if child.__class__ is Node:
+                data.children.append(child)
+            else:
+                data.set_field(child, chunk.fields[child])
+    return header, data
@@ -0,0 +1,252 @@
+import re
+from sys import intern
+
+from ivtools.events import END, FIELD, HEADER, START
+from ivtools.fields import NUMERIC_FIELDS, LazyArray, parse_values
+from ivtools.node import Node
+from ivtools.traverse import SKIP, walk
+
+# Bump when the parsed tree changes so cached parses are invalidated
+VERSION = 4
+
+TOKENS = re.compile(r"[{}\[\]]")
+BRACKETS = re.compile(r"[{}\[\]()]")
+ARRAY_BREAK = re.compile(r"[{}\[\]#]")
+
+
+class IVParser(object):
+
+    def __init__(self, numeric=True):
+        self.numeric = numeric
+
+    def read(self, file):
+        events = self.events(file)
+        _, header = next(events)
+        return header, self.build(events)
+
+    def parse(self, file):
+        return self.read(file)[1]
+
+    def events(self, file):
+        return self.tokenize(file)
+
+    def tokenize(self, lines):
+        # Events from an iterable of lines. At each [ array may read the body of the field itself, in which
+        # case the rest of the line is dropped
+        header = []
+        header_open = True
+        text = []
+        depth = 0
+        field_open = False
+        # Depths of the open node list fields
+        lists = []
+        for line in lines:
+            if header_open:
+                if "{" in line:
+                    header_open = False
+                    yield HEADER, "".join(header)
+                elif line.lstrip().startswith("#"):
+                    header.append(line.strip())
+            if field_open and ARRAY_BREAK.search(line) is None:
+                # Array body
+                text.append(line)
+                continue
+            if not line.strip():
+                continue
+            if depth and not field_open and BRACKETS.search(line) is None:
+                # One-line field
+                words = line.split()
+                yield FIELD, intern(words[0]), " ".join(words[1:])
+                continue
+            body = line.split("#")[0] + "\n" if "#" in line else line
+            start = 0
+            for match in TOKENS.finditer(body):
+                text.append(body[start:match.start()])
+                start = match.end()
+                char = match.group()
+                if char == "{":
+                    if field_open:
+                        # The field holds nodes, as VRML children [ ... ] does, so it is opened like a node
+                        name, _, text = "".join(text).partition("[")
+                        yield START, self.__node_name(name) + " [", None
+                        lists.append(depth)
+                        depth += 1
+                        field_open = False
+                        yield from list_uses(text)
+                        text = [text]
+                    yield START, self.__node_name("".join(text)), self.__node_comment(line)
+                    depth += 1
+                    text = []
+                elif char == "}":
+                    if depth:
+                        depth -= 1
+                        yield END,
+                    text = []
+                elif char == "[":
+                    event = self.array(lines, text, body[:start])
+                    if event is not None:
+                        yield event
+                        text = []
+                        break
+                    text.append(char)
+                    field_open = True
+                elif not field_open and lists and lists[-1] == depth - 1:
+                    lists.pop()
+                    depth -= 1
+                    yield END,
+                    text = []
+                else:
+                    field_open = False
+                    yield self.__field("".join(text))
+                    text = []
+            else:
+                text.append(body[start:])
+        if header_open:
+            yield HEADER, "".join(header)
+
+    @staticmethod
+    def build(events, root=None, defs=None):
+        # Builds a tree from node and field events, returning early at an unmatched end event. USE references
+        # may also refer to the DEF nodes in defs, which the DEF nodes closed here are added to
+        builder = TreeBuilder(root, defs)
+        builder.feed(events)
+        return builder.root
+
+    def array(self, lines, text, prefix):
+        # The field event of the array opened by the [ that prefix ends with, on the last line, if its body is
+        # read here rather than line by line. text holds the field name
+        return None
+
+    def __field(self, text):
+        name, _, value = text.partition("[")
+        name = intern(name.strip())
+        if self.numeric and name in NUMERIC_FIELDS:
+            # Numeric arrays are parsed when they are first used, and otherwise written back as they were read
+            return FIELD, name, LazyArray(value, 0, len(value), name)
+        return FIELD, name, parse_values(name, value, self.numeric)
+
+    @staticmethod
+    def __node_name(text):
+        return " ".join(text.strip().split("\n")[-1].split())
+
+    @staticmethod
+    def __node_comment(line):
+        return " ".join(line.split("#")[1:]).strip() if "#" in line else None
+
+
+class TreeBuilder(object):
+
+    # Builds a tree from the top down. The open nodes are kept on a stack, so opening, closing and adding
+    # fields to the current node take the same time at any depth. USE references to a closed DEF node of the
+    # same field add that node again, so it is shared; others are kept as the fields they were read as
+
+    def __init__(self, root=None, defs=None):
+        self.root = Node() if root is None else root
+        self.stack = [self.root]
+        # The last closed node of each DEF name
+        self.defs = {} if defs is None else defs
+        # USE fields that referred to no node read so far, which the DEF nodes of an earlier piece may resolve
+        self.unresolved = 0
+
+    def start(self, name, comment=None):
+        node = Node(name, comment)
+        self.stack[-1].children.append(node)
+        self.stack.append(node)
+        return node
+
+    def field(self, name, value):
+        if not (references(name, value) and self.use(name, value)):
+            self.stack[-1].set_field(name, value)
+
+    def use(self, name, value):
+        # Adds the nodes a USE field refers to, returning whether they were all found
+        node = self.shared(name, value)
+        if node is None:
+            self.unresolved += 1
+            return False
+        self.stack[-1].children.append(node)
+        return True
+
+    def shared(self, name, value):
+        # The node a USE field refers to, or None if any of its references is to no closed DEF node. A list of
+        # references becomes a node list, as a list that holds nodes does
+        if value.__class__ is list:
+            nodes = [self.__shared(None, text) for text in ",".join(value).split(",") if text.strip()]
+            if not nodes or None in nodes:
+                return None
+            node = Node.create(name, None, "[")
+            node.children.extend(nodes)
+            return node
+        return self.__shared(None, "USE " + value) if name == "USE" else self.__shared(name, value)
+
+    def __shared(self, field, text):
+        words = text.replace(",", " ").split()
+        node = self.defs.get(words[1]) if len(words) == 2 and words[0] == "USE" else None
+        return node if node is not None and node.field == field else None
+
+    def end(self):
+        # Returns False, leaving the root open, at an unmatched end
+        if len(self.stack) == 1:
+            return False
+        node = self.stack.pop()
+        if node.def_name is not None:
+            self.defs[node.def_name] = node
+        return True
+
+    def feed(self, events):
+        # Applies events until they run out or an end is unmatched, which returns False
+        start, field, end = self.start, self.field, self.end
+        for event in events:
+            if event[0] == START:
+                start(event[1], event[2])
+            elif event[0] == FIELD:
+                field(event[1], event[2])
+            elif event[0] == END and not end():
+                return False
+        return True
+
+
+def references(name, value):
+    # Whether a field as read is a USE reference, or a list of them
+    if value.__class__ is str:
+        return name == "USE" or value.startswith("USE ")
+    return value.__class__ is list and bool(value) and value[0].startswith("USE ")
+
+
+def resolve(data, defs):
+    # Resolves the USE fields left in data, a piece read on its own, against defs, the DEF nodes read before
+    # it, as a TreeBuilder reading both in one go would have. The DEF nodes in data are added to defs as they
+    # close, so each reference sees the nodes before it
+    builder = TreeBuilder(data, defs)
+    seen = set()
+
+    def enter(node, parent, depth):
+        # Nodes already shared within data are resolved once
+        if node.def_name is not None:
+            if node in seen:
+                return SKIP
+            seen.add(node)
+
+    def leave(node, parent, depth):
+        if node.def_name is not None:
+            defs[node.def_name] = node
+
+    def field(node, name, depth):
+        value = node.fields[name]
+        if references(name, value):
+            shared = builder.shared(name, value)
+            if shared is not None:
+                # The shared node has been visited where it was defined, so the walk passes over it here
+                node.children[node.children.index(name)] = shared
+                del node.fields[name]
+
+    walk(data, enter, leave, field)
+
+
+def list_uses(text):
+    # Field events for the USE references on the lines before the first node of a list
+    for row in text.strip().split("\n")[:-1]:
+        words = row.replace(",", " ").split()
+        for i in range(len(words) - 1):
+            if words[i] == "USE":
+                yield FIELD, "USE", words[i + 1]
@@ -0,0 +1,182 @@
+import hashlib
+import io
+import re
+
+from ivtools.events import HEADER
+from ivtools.files import is_compressed, open_input
+from ivtools.instance import update
+from ivtools.mapped import MappedParser
+from ivtools.node import Node
+from ivtools.parser import TreeBuilder
+from ivtools.traverse import walk
+from ivtools.writer import IVWriter
+
+BRACKETS = b"{}[]"
+NAME_CHAR = re.compile(rb"[\w.:-]")
+
+
+class PartialReader(object):
+
+    # Reads only the nodes with the given DEF names or types, and the nodes under them. The file is searched
+    # for their names with regular expressions and each is cut out by counting braces, so nothing else is
+    # tokenized or built. The span of each node is kept, so a write copies the file as it was and splices in
+    # only the nodes that have changed since they were read
+
+    def __init__(self, names=None, types=None):
+        if not names and not types:
+            raise ValueError("A partial read needs DEF names or node types")
+        # Each pattern starts with a literal, which the regular expression engine searches for as fast as find.
+        # Alternatives that start differently are much slower, so each type gets a pattern of its own
+        self.patterns = []
+        if names:
+            self.patterns.append(re.compile(rb"DEF\s+(?:%s)\s+[^\s{}\[\]]+\s*\{" % b"|".join(
+                re.escape(name.encode()) for name in names
+            )))
+        for name in types or ():
+            self.patterns.append(re.compile(rb"%s\s*\{" % re.escape(name.encode())))
+        self.buffer = None
+        self.data = None
+        # The start and end of each node read, its indentation and the digest it was read with
+        self.spans = []
+
+    def read(self, file_path):
+        # Compressed files cannot be mapped, so they are decompressed in full, but still only partly parsed
+        if is_compressed(file_path):
+            with open_input(file_path, binary=True) as file:
+                self.buffer = file.read()
+        else:
+            self.buffer = MappedParser.map(file_path)
+        self.data = Node()
+        self.spans = []
+        position = 0
+        # The next match of each pattern, or None once it has no more
+        matches = [pattern.search(self.buffer) for pattern in self.patterns]
+        while True:
+            for i, match in enumerate(matches):
+                if match is not None and match.start() < position:
+                    matches[i] = self.patterns[i].search(self.buffer, position)
+            found = [match for match in matches if match is not None]
+            if not found:
+                break
+            match = min(found, key=lambda item: item.start())
+            if match.start() and NAME_CHAR.match(self.buffer, match.start() - 1):
+                # Part of a longer name
+                position = match.start() + 1
+                continue
+            start, indent = self.__start(match)
+            if start is None:
+                # In a comment
+                position = match.end()
+                continue
+            end = self.__end(match.end())
+            node = parse_node(self.buffer[start:end])
+            self.data.children.append(node)
+            self.spans.append((node, start, end, indent, fingerprint(node)))
+            position = end
+        return self.header(), self.data
+
+    def header(self):
+        # The comment lines before the first node, as IVParser reads them
+        first = self.buffer.find(b"{")
+        text = self.buffer[:first if first >= 0 else len(self.buffer)].decode("utf8", "ignore")
+        lines = text.split("\n")[:-1] if first >= 0 else text.split("\n")
+        return "".join(line.strip() for line in lines if line.lstrip().startswith("#"))
+
+    def write(self, file):
+        # Copies the file with each changed node written again in its place. Nodes removed from the root are
+        # left out and nodes added to it are written at the end. Views write the mapped bytes without copying them
+        view = memoryview(self.buffer)
+        kept = set(map(id, self.data.children))
+        spanned = set()
+        position = 0
+        for node, start, end, indent, digest in self.spans:
+            file.write(view[position:start])
+            position = end
+            spanned.add(id(node))
+            if id(node) not in kept:
+                continue
+            if fingerprint(node) == digest:
+                file.write(view[start:end])
+            else:
+                file.write(node_text(node).rstrip("\n").replace("\n", "\n" + indent).encode("utf8"))
+        file.write(view[position:])
+        view.release()
+        added = [node for node in self.data.children if id(node) not in spanned]
+        if added:
+            file.write(b"\n")
+            for node in added:
+                file.write(node_text(node).encode("utf8"))
+
+    def __start(self, match):
+        # Where the node name starts, after anything else on its line, and the indentation of the line
+        line_start = self.buffer.rfind(b"\n", 0, match.start()) + 1
+        prefix = self.buffer[line_start:match.start()]
+        if b"#" in prefix:
+            return None, None
+        cut = max(prefix.rfind(bytes([char])) for char in BRACKETS) + 1
+        name_start = line_start + cut + len(prefix[cut:]) - len(prefix[cut:].lstrip())
+        indent = prefix[:len(prefix) - len(prefix.lstrip())].decode("utf8", "ignore")
+        return name_start, indent
+
+    def __end(self, position):
+        # The end of the closing brace that matches the one just before position. Braces are found with find,
+        # which is many times faster than a regular expression over long arrays
+        buffer = self.buffer
+        opened = position - 1
+        depth = 1
+        while depth:
+            end = buffer.find(b"}", position)
+            if end < 0:
+                raise ValueError("Unmatched { at byte %i" % opened)
+            start = buffer.find(b"{", position, end)
+            token = end if start < 0 else start
+            comment = buffer.find(b"#", position, token)
+            if comment >= 0:
+                position = buffer.find(b"\n", comment) + 1 or len(buffer)
+            elif start >= 0:
+                depth += 1
+                position = start + 1
+            else:
+                depth -= 1
+                position = end + 1
+        return position
+
+
+def parse_node(text):
+    # Each node is parsed on its own, so USE references to nodes outside it stay as the fields they were read
+    # as. Large arrays are left unparsed, as in mapped reads, and copied as they are unless they are used
+    events = MappedParser().events(text)
+    for event in events:
+        if event[0] == HEADER:
+            break
+    builder = TreeBuilder()
+    builder.feed(events)
+    return builder.root.nodes()[0]
+
+
+def fingerprint(node):
+    # A digest of the subtree as it stands. Arrays parsed since the read count as changed, as their text
+    # is no longer known
+    h = hashlib.blake2b(digest_size=16)
+
+    def enter(child, parent, depth):
+        h.update(("%i\0%s\0%s\0" % (depth, child.name, child.comment)).encode())
+        for name in child.children:
+            if name.__class__ is str:
+                h.update(b"F%s\0" % name.encode())
+                update(h, child.fields[name])
+            else:
+                h.update(b"N")
+
+    root = Node()
+    root.children.append(node)
+    walk(root, enter)
+    return h.digest()
+
+
+def node_text(node):
+    root = Node()
+    root.children.append(node)
+    output = io.StringIO()
+    IVWriter(output).write_data(root)
+    return output.getvalue()
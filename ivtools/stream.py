@@ -0,0 +1,177 @@
+import os
+from collections import ChainMap
+
+from ivtools.convert import get_converter
+from ivtools.events import HEADER, START, node_events, skip_node, tree_events
+from ivtools.files import COMPRESS_LEVEL, is_binary, is_compressed, open_input, replace_output
+from ivtools.instance import Instancer
+from ivtools.mapped import MappedParser
+from ivtools.metrics import DEBUG, INFO, Metrics
+from ivtools.namespace import Namespace
+from ivtools.node import ApplyReport, Node
+from ivtools.parser import IVParser
+from ivtools.weld import TOLERANCE, Welder
+from ivtools.writer import IVWriter
+
+
+class StreamEditor(object):
+
+    def __init__(self, metrics=None, mapped=False):
+        self.metrics = Metrics() if metrics is None else metrics
+        self.mapped = mapped
+        self.events = None
+        self.new_nodes = None
+        self.report = None
+
+    def read(self, file):
+        if isinstance(file, str):
+            if is_binary(file):
+                raise ValueError("Binary Inventor files cannot be streamed: %s" % file)
+            self.metrics.count("bytes_read", os.path.getsize(file))
+        self.events = self.__read(file, self.mapped)
+
+    def write(self, file, compress=None, level=COMPRESS_LEVEL):
+        # Paths are gzip-compressed when compress is set, or by extension when it is None.
+        # Every queued operation runs while the events are written, so this is the only timed phase.
+        # The input is still being read while the output is written, so paths are written through a new file
+        with self.metrics.phase("write"):
+            if isinstance(file, str):
+                with replace_output(file, compress, level) as stream:
+                    IVWriter(stream).write_events(self.events)
+            else:
+                IVWriter(file).write_events(self.events)
+        self.events = None
+        if isinstance(file, str):
+            self.metrics.count("bytes_written", os.path.getsize(file))
+            self.metrics.emit(INFO, "Wrote %s", file)
+        if self.report is not None:
+            self.metrics.count("nodes_visited", self.report.nodes)
+            self.metrics.count("nodes_added", self.report.nodes_added)
+            self.metrics.count("fields_added", self.report.fields_added)
+            self.metrics.count("fields_changed", self.report.fields_changed)
+            self.metrics.emit(INFO, "%s", self.report)
+
+    def load_nodes_file(self, file_path):
+        self.new_nodes = Namespace(file_path)
+        self.metrics.emit(DEBUG, "%s", self.new_nodes)
+
+    def apply_nodes(self):
+        # The report is complete once the stream has been written
+        self.report = ApplyReport()
+        self.events = self.__apply_nodes(self.events, self.new_nodes, self.report)
+        return self.report
+
+    def convert(self, ext):
+        self.events = self.__convert(self.events, get_converter(ext))
+
+    def weld(self, tolerance=TOLERANCE):
+        # The report is complete once the stream has been written
+        welder = Welder(tolerance)
+        self.events = self.__weld(self.events, welder, self.metrics)
+        return welder.report
+
+    def instance(self):
+        # The report is complete once the stream has been written
+        instancer = Instancer()
+        self.events = self.__instance(self.events, instancer, self.metrics)
+        return instancer.report
+
+    def delete(self, node_name):
+        self.events = self.__delete(self.events, node_name, self.metrics)
+
+    @staticmethod
+    def __read(file, mapped):
+        if isinstance(file, str) and mapped and not is_compressed(file):
+            yield from MappedParser().events(MappedParser.map(file))
+        elif isinstance(file, str):
+            with open_input(file) as stream:
+                yield from IVParser().events(stream)
+        else:
+            yield from IVParser().events(file)
+
+    @staticmethod
+    def __delete(events, node_name, metrics):
+        for event in events:
+            if event[0] == START and event[1] == node_name:
+                skip_node(events)
+                metrics.count("nodes_deleted")
+                metrics.emit(INFO, "%s node deleted", node_name)
+            else:
+                yield event
+
+    @staticmethod
+    def __convert(events, converter):
+        # Top-level nodes are converted one at a time, so Inventor properties set at the top level are not
+        # carried into the nodes after them. Each top-level node is dropped once it is written, and only empty
+        # stand-ins are kept for each DEF name read: the source node's field and type for USE references to
+        # resolve against, and the converted node's for them to be written as USE again. A shared geometry node
+        # that had its coordinates moved out where it was defined is written as a USE without them
+        sources = {}
+        converted = {}
+        defined = {}
+        for event in events:
+            if event[0] == HEADER:
+                yield HEADER, converter.convert_header()
+            elif event[0] == START:
+                defs = {}
+                node = IVParser.build(events, Node(event[1], event[2]), ChainMap(defs, sources))
+                if node.def_name is not None:
+                    defs[node.def_name] = node
+                new_node = converter.convert_node(node, ChainMap({}, converted))
+                replayed = {}
+                if new_node is not None:
+                    yield from node_events(new_node, ChainMap(replayed, defined))
+                for name, source in defs.items():
+                    converted.pop((sources.get(name), None), None)
+                    defined.pop(name, None)
+                    # References to nodes the conversion drops are dropped with them, as in a full read
+                    sources[name] = Node.create(source.field, name, source.type)
+                    if name in replayed:
+                        new_node = replayed[name]
+                        defined[name] = converted[sources[name], None] = Node.create(new_node.field, name, new_node.type)
+            else:
+                yield event
+
+    @staticmethod
+    def __weld(events, welder, metrics):
+        # Top-level nodes are welded one at a time, so points set at the top level for the nodes after them
+        # are left as they are
+        for event in events:
+            if event[0] == START:
+                data = Node()
+                data.add_node(IVParser.build(events, Node(event[1], event[2])))
+                removed, saved = welder.report.vertices_removed, welder.report.bytes_saved
+                welder.weld_data(data)
+                metrics.count("vertices_removed", welder.report.vertices_removed - removed)
+                metrics.count("bytes_saved", welder.report.bytes_saved - saved)
+                yield from tree_events(data)
+            else:
+                yield event
+        metrics.emit(INFO, "%s", welder.report)
+
+    @staticmethod
+    def __instance(events, instancer, metrics):
+        # Subtrees are only shared within each top-level node
+        for event in events:
+            if event[0] == START:
+                data = Node()
+                data.add_node(IVParser.build(events, Node(event[1], event[2])))
+                removed = instancer.report.nodes_removed
+                instancer.instance_data(data)
+                metrics.count("nodes_removed", instancer.report.nodes_removed - removed)
+                yield from tree_events(data)
+            else:
+                yield event
+        metrics.emit(INFO, "%s", instancer.report)
+
+    @staticmethod
+    def __apply_nodes(events, new_nodes, report):
+        # Only DEF nodes named in the nodes file are held in memory while they are edited
+        for event in events:
+            if event[0] == START and Node(event[1]).def_name in vars(new_nodes):
+                data = Node()
+                data.add_node(IVParser.build(events, Node(event[1], event[2])))
+                data.apply_nodes(new_nodes, report)
+                yield from tree_events(data)
+            else:
+                yield event
@@ -0,0 +1,215 @@
+import numpy as np
+
+from ivtools.traverse import SKIP, walk
+
+# Points are welded when they fall in the same cell of a grid this size; 0 welds exact duplicates only
+TOLERANCE = 0.0
+# Nodes that may sit between a Coordinate3 and the IndexedFaceSet it is welded for, without using the points
+PROPERTIES = {
+    "Material", "MaterialBinding", "ShapeHints", "DrawStyle", "Complexity", "LightModel", "Texture2",
+    "Transform", "Translation", "Rotation", "Scale", "MatrixTransform", "Info", "Label"
+}
+# Nodes whose values are looked up through coordIndex unless the face set has an index of its own
+PER_VERTEX = {
+    "Normal": "normalIndex", "TextureCoordinate2": "textureCoordIndex",
+    "normal": "normalIndex", "texCoord": "texCoordIndex", "color": "colorIndex"
+}
+HASH_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93],
+                            np.uint64)
+
+
+class WeldReport(object):
+
+    def __init__(self):
+        self.shapes = 0
+        self.skipped = 0
+        self.vertices = 0
+        self.vertices_removed = 0
+        self.bytes_saved = 0
+
+    def __str__(self):
+        return "%i face sets welded, %i skipped: %i of %i vertices removed, %i array bytes saved" % (
+            self.shapes, self.skipped, self.vertices_removed, self.vertices, self.bytes_saved
+        )
+
+
+class Welder(object):
+
+    # Welds the points of each Coordinate3 or VRML Coordinate used by a single IndexedFaceSet, drops the points
+    # its coordIndex does not use and remaps the index. All face sets are welded together in one set of
+    # array operations, so scenes of many small shapes cost little more than one large shape
+
+    def __init__(self, tolerance=TOLERANCE):
+        self.tolerance = tolerance
+        self.report = WeldReport()
+        # Inventor normals and texture coordinates apply to every later shape in their separator, so once a
+        # scene has shown any, only face sets with their own indices are welded. Kept across calls for streams
+        self.inherited = set()
+
+    def weld_data(self, data):
+        pairs = self.pairs(data)
+        points = [coord.get_field("point") for coord, _ in pairs]
+        indices = [face_set.get_field("coordIndex") for _, face_set in pairs]
+        valid = valid_indices(points, indices).tolist()
+        if not all(valid):
+            pairs, points, indices = [
+                [item for item, ok in zip(items, valid) if ok] for items in (pairs, points, indices)
+            ]
+        self.report.skipped += len(valid) - len(pairs)
+        if pairs:
+            for (coord, face_set), old_points, new_points, new_index in zip(pairs, points, *weld_points(
+                points, indices, self.tolerance
+            )):
+                self.report.vertices += len(old_points)
+                self.report.vertices_removed += len(old_points) - len(new_points)
+                self.report.bytes_saved += old_points.nbytes - new_points.nbytes
+                coord.set_field("point", new_points)
+                face_set.set_field("coordIndex", new_index)
+        self.report.shapes += len(pairs)
+        return self.report
+
+    def pairs(self, data):
+        # The coordinate nodes and the face sets that alone use them, where welding cannot change what else
+        # the points are used for
+        pairs = []
+        candidates = self.__inventor_pairs(data)
+        counts = {"IndexedFaceSet": 0}
+        # Nodes shared through USE are welded once
+        shared = set()
+
+        def enter(node, parent, depth):
+            if node.def_name is not None:
+                if node in shared:
+                    return SKIP
+                shared.add(node)
+            if node.type == "IndexedFaceSet":
+                counts["IndexedFaceSet"] += 1
+                if node.field == "geometry":
+                    coord = self.__vrml_coord(node)
+                    if coord is not None:
+                        pairs.append((coord, node))
+                    return SKIP
+            elif node.type == "Separator":
+                candidates.extend(self.__inventor_pairs(node))
+            elif node.field is None and node.type in PER_VERTEX:
+                self.inherited.add(node.type)
+
+        walk(data, enter)
+        for coord, face_set in candidates:
+            if all(PER_VERTEX[name] in face_set.fields for name in self.inherited):
+                pairs.append((coord, face_set))
+        self.report.skipped += counts["IndexedFaceSet"] - len(pairs)
+        return pairs
+
+    @staticmethod
+    def __vrml_coord(face_set):
+        coord = None
+        for child in face_set.nodes():
+            if child.field == "coord":
+                coord = child
+            elif child.field in PER_VERTEX and PER_VERTEX[child.field] not in face_set.fields:
+                return None
+        if coord is None or coord.def_name is not None or not numeric(coord, face_set):
+            return None
+        return coord
+
+    @staticmethod
+    def __inventor_pairs(parent):
+        # The points of a Coordinate3 reach every later node in its parent, and past the parent unless it is
+        # a Separator, so each is paired with the one face set before the next Coordinate3 or the end
+        pairs = []
+        coord = face_set = None
+        for node in parent.nodes() + [None]:
+            if node is None or node.type == "Coordinate3":
+                if coord is not None and face_set is not None and numeric(coord, face_set):
+                    pairs.append((coord, face_set))
+                coord = node if node is not None and node.def_name is None else None
+                face_set = None
+            elif coord is None:
+                continue
+            elif node.type == "IndexedFaceSet" and face_set is None and not node.nodes():
+                face_set = node
+            elif node.type not in PROPERTIES or node.nodes():
+                coord = None
+        return pairs
+
+
+def numeric(coord, face_set):
+    points = coord.get_field("point") if "point" in coord.fields else None
+    index = face_set.get_field("coordIndex") if "coordIndex" in face_set.fields else None
+    return isinstance(points, np.ndarray) and isinstance(index, np.ndarray) and points.shape[1:] == (3,)
+
+
+def valid_indices(points, indices):
+    # Whether each index only refers to its own points, with -1 ending faces
+    lengths = [len(index) for index in indices]
+    if not sum(lengths):
+        return np.ones(len(indices), bool)
+    all_index = np.concatenate(indices)
+    bad = (all_index < -1) | (all_index >= np.repeat([len(array) for array in points], lengths))
+    invalid = np.zeros(len(indices), bool)
+    invalid[np.repeat(np.arange(len(indices)), lengths)[bad]] = True
+    return ~invalid
+
+
+def weld_points(points, indices, tolerance=TOLERANCE):
+    # Welds each array of points against itself and keeps only the points its index uses, in their original
+    # order. Returns the new points and remapped indices
+    counts = np.array([len(array) for array in points], np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    all_points = np.concatenate(points) if points else np.empty((0, 3), np.float32)
+    shape_ids = np.repeat(np.arange(len(points), dtype=np.int64), counts)
+    lengths = np.array([len(index) for index in indices], np.int64)
+    all_index = np.concatenate(indices).astype(np.int64) if indices else np.empty(0, np.int64)
+    faces = all_index >= 0
+    all_index[faces] += np.repeat(offsets[:-1], lengths)[faces]
+
+    used = np.zeros(len(all_points), bool)
+    used[all_index[faces]] = True
+    ids = np.flatnonzero(used)
+    if tolerance:
+        cells = np.floor(all_points[ids].astype(np.float64) / tolerance + 0.5).astype(np.int64)
+    else:
+        # -0.0 + 0.0 is 0.0, so the two zeros weld
+        cells = (all_points[ids] + np.float32(0)).view(np.int32)
+    keys = [shape_ids[ids]] + [cells[:, i] for i in range(cells.shape[1])]
+
+    # Sort by a hash of the key in the high bits and the position in the low bits, so equal keys end up
+    # together in first-use order. Points are only welded if their whole keys match, so hash collisions
+    # can only leave points unwelded
+    position_bits = max(int(len(ids)).bit_length(), 1)
+    hashes = np.zeros(len(ids), np.uint64)
+    for column, multiplier in zip(keys, HASH_MULTIPLIERS):
+        hashes ^= column.astype(np.uint64)
+        hashes *= multiplier
+    hashes ^= hashes >> np.uint64(31)
+    hashes >>= np.uint64(position_bits)
+    hashes <<= np.uint64(position_bits)
+    hashes |= np.arange(len(ids), dtype=np.uint64)
+    hashes.sort()
+    order = (hashes & np.uint64((1 << position_bits) - 1)).astype(np.int64)
+    hashes >>= np.uint64(position_bits)
+    starts = np.ones(len(ids), bool)
+    starts[1:] = hashes[1:] != hashes[:-1]
+    # Neighbours with equal hashes are welded only if their keys match too
+    same = np.flatnonzero(~starts[1:])
+    for column in keys:
+        starts[same + 1] |= column[order[same]] != column[order[same + 1]]
+
+    # Welded points take the place of the first point of their group, so the first points are kept in order
+    first = np.zeros(len(ids), bool)
+    first[order[starts]] = True
+    ranks = np.cumsum(first) - 1
+    kept = ids[first]
+    new_offsets = np.searchsorted(shape_ids[kept], np.arange(len(points) + 1))
+    remap = np.full(len(all_points), -1, np.int64)
+    remap[ids[order]] = ranks[order[starts]][np.cumsum(starts) - 1]
+    remap[ids] -= new_offsets[shape_ids[ids]]
+
+    kept_points = all_points[kept]
+    new_points = [kept_points[start:end] for start, end in zip(new_offsets[:-1], new_offsets[1:])]
+    new_index = np.full(len(all_index), -1, np.int32)
+    new_index[faces] = remap[all_index[faces]]
+    ends = np.cumsum(lengths).tolist()
+    new_indices = [new_index[start:end] for start, end in zip([0] + ends[:-1], ends)]
+    return new_points, new_indices